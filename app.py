@@ -1,254 +1,288 @@
-from flask import Flask, render_template, jsonify, send_file
+from flask import Flask, render_template, jsonify, Response, request, stream_with_context
 import json
-import os
-import csv
-import io
 import uuid
-import datetime
-from urllib.parse import urlparse
-from apscheduler.schedulers.background import BackgroundScheduler
-import feedparser
-import yaml
-import requests
-from bs4 import BeautifulSoup
-import tldextract
-import re
+from itertools import islice
+from store import open_store, StoreCache, parse_published
+from exporters import (iter_csv, iter_indicator_csv, iter_stix_bundle, stix_indicator,
+                       utc_iso, IOC_FIELDS, STIX_NAMESPACE)
 
 # -------------------------
 # CONFIG
 # -------------------------
+# The web tier only reads the store; refreshes run in worker.py.
 app = Flask(__name__)
 
-DATA_FILE = "data/feed_normalized.json"
-SOURCES_FILE = "sources.yaml"
-
-IOC_FIELDS = [
-    "ip",
-    "domain",
-    "email",
-    "md5",
-    "sha1",
-    "sha256",
-    "file_path",
-    "service",
-    "cve"
-]
+DB_FILE = "data/feed.db"
+DATA_FILE = "data/feed_normalized.json"  # legacy store, now an optional export
+
+# Dashboard: first page rendered server-side, the rest fetched on scroll
+DASHBOARD_PAGE_SIZE = 50
+DASHBOARD_PARAMS = ("source", "category", "has_iocs", "q")
+
+# /api/feed paging
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+API_PARAMS = ("source", "category", "has_iocs", "ioc_type", "from", "to", "collapse", "since", "limit", "fields")
+ENTRY_FIELDS = ("title", "link", "summary", "published", "source", "category", "iocs", "guid")
+
+# /api/search paging
+SEARCH_PAGE_SIZE = 50
+SEARCH_MAX_PAGE_SIZE = 200
+
+# /api/ioc bulk lookups
+API_MAX_LOOKUP = 10000
+
+# TAXII 2.1 style read-only collection of the STIX indicators
+TAXII_MEDIA_TYPE = "application/taxii+json;version=2.1"
+TAXII_COLLECTION = str(uuid.uuid5(STIX_NAMESPACE, "indicators"))
+TAXII_PAGE_SIZE = 1000
 
 # -------------------------
 # HELPERS
 # -------------------------
+store = open_store(DB_FILE, DATA_FILE)
+views = StoreCache(store)  # parsed feed + derived views, rebuilt when the store changes
+
 def load_feed():
-    if not os.path.exists(DATA_FILE):
-        return []
-    with open(DATA_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def group_by_category(feed):
-    grouped = {}
-    sources = set()
-    for entry in feed:
-        grouped.setdefault(entry.get("category", "Unknown"), []).append(entry)
-        sources.add(entry.get("source", "Unknown"))
-    return grouped, sorted(sources)
-
-def has_real_iocs(entry):
-    return any(entry.get("iocs", {}).get(f) for f in IOC_FIELDS)
-
-def get_article_domain(url):
-    try:
-        return urlparse(url).netloc.lower()
-    except Exception:
-        return ""
+    return views.get("feed", lambda: list(store.entries()))
 
-# -------------------------
-# IOC EXTRACTION
-# -------------------------
-IP_REGEX = r"\b(?:\d{1,3}\.){3}\d{1,3}\b"
-MD5_REGEX = r"\b[a-fA-F0-9]{32}\b"
-SHA1_REGEX = r"\b[a-fA-F0-9]{40}\b"
-SHA256_REGEX = r"\b[a-fA-F0-9]{64}\b"
-EMAIL_REGEX = r"\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-z]{2,}\b"
-CVE_REGEX = r"\bCVE-\d{4}-\d{4,7}\b"
-DOMAIN_REGEX = r"\b(?:[a-zA-Z0-9-]+\.)+[a-zA-Z]{2,}\b"
-
-def extract_iocs_from_text(text):
-    iocs = {
-        "ip": re.findall(IP_REGEX, text),
-        "domain": list(set([tldextract.extract(d).fqdn for d in re.findall(DOMAIN_REGEX, text) if d])),
-        "email": re.findall(EMAIL_REGEX, text),
-        "md5": re.findall(MD5_REGEX, text),
-        "sha1": re.findall(SHA1_REGEX, text),
-        "sha256": re.findall(SHA256_REGEX, text),
-        "cve": re.findall(CVE_REGEX, text),
-        "file_path": [],
-        "service": []
-    }
-    return iocs
-
-def extract_iocs_from_url(url):
-    try:
-        r = requests.get(url, timeout=10)
-        soup = BeautifulSoup(r.text, "html.parser")
-        text = soup.get_text(separator="\n")
-        return extract_iocs_from_text(text)
-    except Exception:
-        return {k: [] for k in IOC_FIELDS}
+def parse_bool(value):
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
 
-# -------------------------
-# SOURCES / RSS FETCHER
-# -------------------------
-def load_sources():
-    if not os.path.exists(SOURCES_FILE):
-        return []
-    with open(SOURCES_FILE, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
-        if isinstance(data, dict):
-            return data.get("feeds", [])
-        elif isinstance(data, list):
-            return data
-        else:
-            return []
-
-def fetch_rss(feed_info):
-    feed = feedparser.parse(feed_info["url"])
-    normalized = []
-
-    for entry in feed.entries:
-        normalized.append({
-            "title": entry.get("title", ""),
-            "link": entry.get("link", ""),
-            "published": entry.get("published", ""),
-            "source": feed_info.get("name", "Unknown"),
-            "category": feed_info.get("category", "Uncategorized"),
-            "iocs": extract_iocs_from_url(entry.get("link", ""))
-        })
-    return normalized
-
-def update_feed():
-    existing = []
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            existing = json.load(f)
-
-    combined = existing.copy()
-    sources = load_sources()
-    for feed_info in sources:
-        combined += fetch_rss(feed_info)
-
-    # Deduplicate
-    seen_links = set()
-    deduped = []
-    for e in combined:
-        if e["link"] not in seen_links:
-            deduped.append(e)
-            seen_links.add(e["link"])
-
-    os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(deduped, f, indent=2)
+def parse_date(value):
+    ts = parse_published(value)
+    if ts is None:
+        raise ValueError(f"invalid date: {value!r}")
+    return ts
+
+def feed_filters(args):
+    """Store filters from request query parameters."""
+    filters = {}
+    for name in ("source", "category", "ioc_type"):
+        if args.get(name):
+            filters[name] = args[name]
+    if args.get("has_iocs"):
+        filters["has_iocs"] = parse_bool(args["has_iocs"])
+    if args.get("collapse"):
+        # One entry per near-duplicate story
+        filters["collapse"] = parse_bool(args["collapse"])
+    if args.get("from"):
+        filters["published_from"] = parse_date(args["from"])
+    if args.get("to"):
+        filters["published_to"] = parse_date(args["to"])
+    return filters
+
+def dashboard_page(args):
+    """
+    One dashboard page, newest first (best match first when searching
+    with ?q=), filtered in the store. ?before= is the cursor from the
+    previous page. Returns (entries, next cursor or None).
+    """
+    filters = feed_filters({k: args[k] for k in DASHBOARD_PARAMS if k in args})
+    filters["collapse"] = True  # syndicated copies are listed on the first article's card
+    if args.get("q", "").strip() and store.fts:
+        # Search results are ranked, so their cursor is an offset
+        offset = int(args.get("before") or 0)
+        entries = store.search(args["q"], DASHBOARD_PAGE_SIZE, offset, **filters)
+        return entries, (offset + len(entries) if len(entries) == DASHBOARD_PAGE_SIZE else None)
+    before_id = int(args.get("before") or 0)
+    entries, last_id = store.page(limit=DASHBOARD_PAGE_SIZE, with_iocs=False, before_id=before_id,
+                                  with_meta=True, **filters)
+    return entries, (last_id if len(entries) == DASHBOARD_PAGE_SIZE else None)
+
+def export_since(args):
+    """
+    Delta mode from ?since=: digits are a cursor from an earlier export's
+    X-Next-Cursor header, anything else a date/time. Returns (cursor, ts).
+    """
+    since = args.get("since", "").strip()
+    if not since:
+        return 0, None
+    if since.isdigit():
+        return int(since), None
+    return 0, parse_date(since)
+
+def streamed(chunks, mimetype, filename, cursor):
+    response = Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+    response.headers["X-Next-Cursor"] = str(cursor)
+    return response
 
 # -------------------------
 # ROUTES
 # -------------------------
 @app.route("/")
 def index():
-    feed = load_feed()
-    grouped, sources = group_by_category(feed)
-    fetching = len(feed) == 0  # Banner if feed empty
-    return render_template("index.html", grouped=grouped, sources=sources, fetching=fetching)
+    try:
+        entries, next_cursor = dashboard_page(request.args)
+    except ValueError:
+        entries, next_cursor = dashboard_page({})
+    categories, sources = views.get("facets", lambda: (store.categories(), store.sources()))
+    fetching = not entries and not any(request.args.get(k) for k in DASHBOARD_PARAMS)  # Banner if feed empty
+    return render_template("index.html", entries=entries, next_cursor=next_cursor,
+                           categories=categories, sources=sources, selected=request.args,
+                           fetching=fetching)
+
+@app.route("/api/dashboard")
+def api_dashboard():
+    try:
+        entries, next_cursor = dashboard_page(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"html": render_template("_cards.html", entries=entries), "next": next_cursor})
+
+@app.route("/api/article/<int:article_id>/iocs")
+def api_article_iocs(article_id):
+    # IOC detail for one dashboard card, loaded when it is expanded
+    return jsonify(store.article_iocs(article_id))
 
 @app.route("/api/feed")
 def api_feed():
-    return jsonify(load_feed())
+    args = request.args
+    if not any(name in args for name in API_PARAMS):
+        body = views.get("feed_json", lambda: json.dumps(load_feed()))
+        return Response(body, mimetype="application/json")
+
+    # Paged, filtered view evaluated in the store. The cursor for the next
+    # poll comes back in X-Next-Cursor; pass it as ?since= next time.
+    try:
+        filters = feed_filters(args)
+        after_id = int(args.get("since") or 0)
+        limit = int(args.get("limit") or API_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    limit = max(1, min(limit, API_MAX_PAGE_SIZE))
+    fields = [f for f in args.get("fields", "").split(",") if f in ENTRY_FIELDS]
+
+    entries, last_id = store.page(after_id, limit, with_iocs=not fields or "iocs" in fields, **filters)
+    if fields:
+        entries = [{f: e[f] for f in fields if f in e} for e in entries]
+    response = jsonify(entries)
+    response.headers["X-Next-Cursor"] = str(last_id)
+    return response
+
+@app.route("/api/search")
+def api_search():
+    # ?q=lockbit "initial access" ransom*  plus the /api/feed filters
+    if not store.fts:
+        return jsonify({"error": "full-text search is not available"}), 501
+    args = request.args
+    try:
+        filters = feed_filters(args)
+        limit = max(1, min(int(args.get("limit") or SEARCH_PAGE_SIZE), SEARCH_MAX_PAGE_SIZE))
+        offset = max(0, int(args.get("offset") or 0))
+        results = store.search(args.get("q", ""), limit, offset, **filters)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"query": args.get("q", ""), "offset": offset, "results": results})
+
+# -------------------------
+# IOC LOOKUP
+# -------------------------
+@app.route("/api/ioc/<path:value>")
+def api_ioc(value):
+    matches = store.lookup_iocs([value]).get(value, [])
+    return jsonify({"value": value, "count": len(matches), "matches": matches})
+
+@app.route("/api/ioc", methods=["POST"])
+def api_ioc_bulk():
+    # Body: ["1.2.3.4", "evil.example", ...] or {"values": [...]}
+    body = request.get_json(silent=True)
+    values = body.get("values") if isinstance(body, dict) else body
+    if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+        return jsonify({"error": 'expected a JSON list of strings or {"values": [...]}'}), 400
+    if len(values) > API_MAX_LOOKUP:
+        return jsonify({"error": f"at most {API_MAX_LOOKUP} values per request"}), 413
+    # Only values with matches appear in "results"
+    return jsonify({"checked": len(values), "results": store.lookup_iocs(values)})
 
 # -------------------------
 # CSV EXPORT
 # -------------------------
+# Every export accepts ?since= (a cursor or a date) for a delta, and returns
+# the cursor for the next delta in X-Next-Cursor. The export is bounded by
+# that cursor, so rows written while it streams arrive in the next delta.
 @app.route("/export/csv")
 def export_csv():
-    feed = load_feed()
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=["title", "source", "link"] + IOC_FIELDS)
-    writer.writeheader()
-
-    for entry in feed:
-        if not has_real_iocs(entry):
-            continue
-
-        article_domain = get_article_domain(entry.get("link", ""))
-        row = {
-            "title": entry.get("title", ""),
-            "source": entry.get("source", ""),
-            "link": entry.get("link", "")
-        }
-        for field in IOC_FIELDS:
-            values = entry.get("iocs", {}).get(field, [])
-            if field == "domain":
-                values = [d for d in values if article_domain not in d.lower()]
-            row[field] = "; ".join(values)
-        writer.writerow(row)
-
-    output.seek(0)
-    return send_file(
-        io.BytesIO(output.getvalue().encode("utf-8")),
-        mimetype="text/csv",
-        as_attachment=True,
-        download_name="ioc_export.csv"
-    )
+    # Streamed straight from the store, a batch of rows at a time
+    try:
+        after_id, ts = export_since(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    cursor = store.latest_id()
+    entries = store.entries(after_id, has_iocs=True, ingested_after=ts, up_to_id=cursor)
+    return streamed(iter_csv(entries, IOC_FIELDS), "text/csv", "ioc_export.csv", cursor)
+
+@app.route("/export/indicators")
+def export_indicators():
+    # One row per distinct IOC with first/last seen, sightings and sources
+    try:
+        after_seq, ts = export_since(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    cursor = store.latest_seq()
+    indicators = store.indicators(IOC_FIELDS, after_seq, up_to_seq=cursor, updated_after=ts)
+    return streamed(iter_indicator_csv(indicators), "text/csv", "ioc_indicators.csv", cursor)
 
 # -------------------------
 # STIX EXPORT
 # -------------------------
 @app.route("/export/stix")
 def export_stix():
-    feed = load_feed()
-    now = datetime.datetime.utcnow().isoformat() + "Z"
-    objects = []
-
-    for entry in feed:
-        if not has_real_iocs(entry):
-            continue
-
-        article_domain = get_article_domain(entry.get("link", ""))
-        for ioc_type, values in entry.get("iocs", {}).items():
-            if ioc_type not in IOC_FIELDS:
-                continue
-            for value in values:
-                if ioc_type == "domain" and article_domain in value.lower():
-                    continue
-                objects.append({
-                    "type": "indicator",
-                    "spec_version": "2.1",
-                    "id": f"indicator--{uuid.uuid4()}",
-                    "created": now,
-                    "modified": now,
-                    "name": f"{ioc_type.upper()} Indicator",
-                    "indicator_types": ["malicious-activity"],
-                    "pattern": f"[{ioc_type}:value = '{value}']",
-                    "pattern_type": "stix",
-                    "valid_from": now
-                })
-
-    bundle = {
-        "type": "bundle",
-        "id": f"bundle--{uuid.uuid4()}",
-        "objects": objects
-    }
-
-    return send_file(
-        io.BytesIO(json.dumps(bundle, indent=2).encode("utf-8")),
-        mimetype="application/json",
-        as_attachment=True,
-        download_name="ioc_export.stix.json"
-    )
+    # One indicator per distinct IOC, with a stable id across exports
+    try:
+        after_seq, ts = export_since(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    cursor = store.latest_seq()
+    indicators = store.indicators(IOC_FIELDS, after_seq, up_to_seq=cursor, updated_after=ts)
+    return streamed(iter_stix_bundle(indicators), "application/json", "ioc_export.stix.json", cursor)
 
 # -------------------------
-# SCHEDULER (non-blocking)
+# TAXII 2.1 (read-only)
 # -------------------------
-scheduler = BackgroundScheduler()
-scheduler.add_job(update_feed, 'interval', hours=1)  # Hourly updates
-scheduler.add_job(update_feed, 'date', run_date=datetime.datetime.now())  # First run in background
-scheduler.start()
+def taxii(body, status=200, headers=None):
+    return Response(json.dumps(body), status=status, mimetype=TAXII_MEDIA_TYPE, headers=headers)
+
+@app.route("/taxii2/collections/")
+def taxii_collections():
+    return taxii({"collections": [{
+        "id": TAXII_COLLECTION,
+        "title": "Threat Intel Feed indicators",
+        "can_read": True,
+        "can_write": False,
+        "media_types": ["application/stix+json;version=2.1"],
+    }]})
+
+@app.route("/taxii2/collections/<collection_id>/objects/")
+def taxii_objects(collection_id):
+    # ?added_after=<timestamp> for deltas; follow "next" while "more" is true
+    if collection_id != TAXII_COLLECTION:
+        return taxii({"title": "Collection not found"}, 404)
+    args = request.args
+    try:
+        added_after = parse_date(args["added_after"]) if args.get("added_after") else None
+        limit = max(1, min(int(args.get("limit") or TAXII_PAGE_SIZE), TAXII_PAGE_SIZE))
+        after = tuple(int(part) for part in args["next"].split(".")) if args.get("next") else None
+        if after is not None and len(after) != 2:
+            raise ValueError("invalid next")
+    except ValueError as e:
+        return taxii({"title": "Bad request", "description": str(e)}, 400)
+
+    rows = list(islice(store.indicators(IOC_FIELDS, updated_after=added_after, after=after), limit + 1))
+    more = len(rows) > limit
+    rows = rows[:limit]
+    body = {"more": more, "objects": [stix_indicator(ind) for ind in rows]}
+    headers = {}
+    if rows:
+        headers["X-TAXII-Date-Added-First"] = utc_iso(rows[0]["updated_at"])
+        headers["X-TAXII-Date-Added-Last"] = utc_iso(rows[-1]["updated_at"])
+    if more:
+        body["next"] = f"{rows[-1]['seq']}.{rows[-1]['id']}"
+    return taxii(body, headers=headers)
 
 # -------------------------
 # START APP
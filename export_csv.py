@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 
-import json
 import csv
 from pathlib import Path
+from store import open_store
+from exporters import has_real_iocs, csv_row
 
 # Input stays where normalized data already lives
+DB_FILE = Path("data/feed.db")
 INPUT_FILE = Path("data/feed_normalized.json")
 
 # Output goes to project root
@@ -12,19 +14,8 @@ OUTPUT_FILE = Path("feed_iocs_only.csv")
 
 IOC_FIELDS = ["ip", "domain", "url", "md5", "sha1", "sha256", "email"]
 
-def has_real_iocs(entry):
-    iocs = entry.get("iocs", {})
-    return any(iocs.get(field) for field in IOC_FIELDS)
-
-def normalize_iocs(iocs):
-    return {
-        field: ";".join(sorted(set(iocs.get(field, []))))
-        for field in IOC_FIELDS
-    }
-
 def main():
-    with INPUT_FILE.open(encoding="utf-8") as f:
-        feed = json.load(f)
+    feed = open_store(str(DB_FILE), str(INPUT_FILE)).entries(has_iocs=True)
 
     with OUTPUT_FILE.open("w", newline="", encoding="utf-8") as csvfile:
         fieldnames = ["title", "source", "link"] + IOC_FIELDS
@@ -35,16 +26,10 @@ def main():
 
         for entry in feed:
             # 🔥 Skip entries with zero IOCs
-            if not has_real_iocs(entry):
+            if not has_real_iocs(entry, IOC_FIELDS):
                 continue
 
-            row = {
-                "title": entry.get("title", ""),
-                "source": entry.get("source", ""),
-                "link": entry.get("link", "")
-            }
-
-            row.update(normalize_iocs(entry.get("iocs", {})))
+            row = csv_row(entry, IOC_FIELDS, sep=";", drop_article_domain=False, dedupe=True)
             writer.writerow(row)
             exported += 1
 
@@ -0,0 +1,150 @@
+"""
+IOC export builders shared by the Flask export routes and export_csv.py.
+
+Builders take any iterable of feed entries and yield output piece by
+piece, so an export streams in constant memory whatever the history size.
+"""
+
+import csv
+import datetime
+import io
+import json
+import uuid
+from urllib.parse import urlparse
+
+CSV_CHUNK_ROWS = 200
+
+# uuid5(NAMESPACE_URL, "https://github.com/dustinfant/Threat-Intel-Feed"); never change
+# it, or every indicator id changes and TIPs re-ingest the whole feed
+STIX_NAMESPACE = uuid.UUID("25199d6a-6140-59b2-84ad-134234e4ed57")
+INDICATOR_FIELDS = ["type", "value", "first_seen", "last_seen", "sightings", "sources"]
+
+# IOC types the worker extracts and the exports publish
+IOC_FIELDS = [
+    "ip",
+    "domain",
+    "email",
+    "md5",
+    "sha1",
+    "sha256",
+    "file_path",
+    "service",
+    "cve"
+]
+
+
+def has_real_iocs(entry, fields):
+    iocs = entry.get("iocs", {})
+    return any(iocs.get(f) for f in fields)
+
+
+def get_article_domain(url):
+    try:
+        return urlparse(url).netloc.lower()
+    except Exception:
+        return ""
+
+
+def utc_iso(ts):
+    """Epoch seconds as a STIX timestamp (UTC, millisecond precision)."""
+    dt = datetime.datetime.fromtimestamp(ts, datetime.timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + "%03dZ" % (dt.microsecond // 1000)
+
+
+# -------------------------
+# CSV
+# -------------------------
+def csv_row(entry, fields, sep="; ", drop_article_domain=True, dedupe=False):
+    row = {
+        "title": entry.get("title", ""),
+        "source": entry.get("source", ""),
+        "link": entry.get("link", "")
+    }
+    article_domain = get_article_domain(entry.get("link", ""))
+    for field in fields:
+        values = entry.get("iocs", {}).get(field, [])
+        if drop_article_domain and field == "domain":
+            values = [d for d in values if article_domain not in d.lower()]
+        if dedupe:
+            values = sorted(set(values))
+        row[field] = sep.join(values)
+    return row
+
+
+def iter_csv(entries, fields, **row_options):
+    """Yield the CSV export (header first) in chunks of CSV_CHUNK_ROWS rows."""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=["title", "source", "link"] + list(fields))
+    writer.writeheader()
+
+    rows = 0
+    for entry in entries:
+        if not has_real_iocs(entry, fields):
+            continue
+        writer.writerow(csv_row(entry, fields, **row_options))
+        rows += 1
+        if rows % CSV_CHUNK_ROWS == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def iter_indicator_csv(indicators):
+    """Yield one CSV row per merged indicator (see FeedStore.indicators)."""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=INDICATOR_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+
+    rows = 0
+    for ind in indicators:
+        writer.writerow(dict(
+            ind,
+            first_seen=utc_iso(ind["first_seen"]),
+            last_seen=utc_iso(ind["last_seen"]),
+            sources="; ".join(ind["sources"]),
+        ))
+        rows += 1
+        if rows % CSV_CHUNK_ROWS == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+# -------------------------
+# STIX 2.1
+# -------------------------
+def stix_id(ioc_type, key):
+    """Same IOC, same id, on every export."""
+    return f"indicator--{uuid.uuid5(STIX_NAMESPACE, f'{ioc_type}:{key}')}"
+
+
+def stix_indicator(ind):
+    """
+    `created` never changes for an id; `modified` moves with every change
+    to the content (new sighting, source, first_seen), as STIX 2.1 requires.
+    """
+    return {
+        "type": "indicator",
+        "spec_version": "2.1",
+        "id": stix_id(ind["type"], ind["key"]),
+        "created": utc_iso(ind["created_at"]),
+        "modified": utc_iso(max(ind["updated_at"], ind["created_at"])),
+        "name": f"{ind['type'].upper()} Indicator",
+        "description": f"Reported in {ind['sightings']} article(s) by {', '.join(ind['sources']) or 'unknown'}",
+        "indicator_types": ["malicious-activity"],
+        "pattern": f"[{ind['type']}:value = '{ind['value']}']",
+        "pattern_type": "stix",
+        "valid_from": utc_iso(ind["first_seen"])
+    }
+
+
+def iter_stix_bundle(indicators):
+    """Yield a STIX bundle as JSON text, one indicator per merged IOC."""
+    yield '{\n  "type": "bundle",\n  "id": "bundle--%s",\n  "objects": [' % uuid.uuid4()
+    sep = "\n    "
+    for ind in indicators:
+        yield sep + json.dumps(stix_indicator(ind))
+        sep = ",\n    "
+    yield "\n  ]\n}\n"
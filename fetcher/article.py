@@ -0,0 +1,67 @@
+"""
+Single-pass article processing.
+
+Each HTML document is parsed once, with the fastest backend available
+(selectolax, then BeautifulSoup on lxml, then the pure-Python html.parser).
+Page chrome is stripped, and the same text yields both the IOC scan input
+and the dashboard summary.
+"""
+
+import re
+
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.parser import HTMLParser
+    BACKEND = "selectolax"
+except ImportError:
+    HTMLParser = None
+    try:
+        import lxml  # noqa: F401  (only needed as a BeautifulSoup backend)
+        BACKEND = "lxml"
+    except ImportError:
+        BACKEND = "html.parser"
+
+BOILERPLATE_TAGS = ["script", "style", "nav", "footer", "header", "aside", "form", "noscript"]
+
+SUMMARY_LENGTH = 600
+
+# RSS/Reddit boilerplate
+SUMMARY_NOISE = [
+    re.compile(r"submitted by.*", re.I),
+    re.compile(r"\[link\]|\[comments\]", re.I),
+    re.compile(r"r/netsec", re.I),
+]
+WHITESPACE = re.compile(r"\s+")
+
+
+def html_text(html, separator=" "):
+    """Visible text of an HTML document or fragment, chrome removed."""
+    if not html:
+        return ""
+    if HTMLParser is not None:
+        tree = HTMLParser(html)
+        tree.strip_tags(BOILERPLATE_TAGS)
+        root = tree.body or tree.root
+        return root.text(separator=separator, strip=True) if root is not None else ""
+
+    soup = BeautifulSoup(html, BACKEND)
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+    # get_text() already skips comments, scripts and stylesheets
+    return soup.get_text(separator=separator, strip=True)
+
+
+def summarize(text):
+    for pattern in SUMMARY_NOISE:
+        text = pattern.sub("", text)
+
+    # Collapse whitespace
+    text = WHITESPACE.sub(" ", text).strip()
+
+    # Truncate for dashboard
+    return text[:SUMMARY_LENGTH] + "…" if len(text) > SUMMARY_LENGTH else text
+
+
+def clean_summary(html):
+    return summarize(html_text(html))
@@ -0,0 +1,101 @@
+"""
+Offline domain normalization for extracted IOCs.
+
+Candidate domains are validated against the Public Suffix List snapshot
+bundled next to this module (public_suffix_list.dat); nothing is ever
+fetched over the network. Results are memoized in a bounded LRU, so vendor
+domains repeated across thousands of articles cost a dict lookup.
+
+To refresh the snapshot, replace the file with a copy of
+https://publicsuffix.org/list/public_suffix_list.dat.
+"""
+
+import os
+from functools import lru_cache
+
+PSL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "public_suffix_list.dat")
+CACHE_SIZE = 65536
+
+# File names that fill malware write-ups (cmd.exe, ntdll.dll), rejected
+# before the suffix lookup. None of these is a public suffix, so this only
+# saves the lookup. Real TLDs that double as extensions (zip, mov, sh, py,
+# so, md, cab) are deliberately absent: evil.zip is a host, and .zip/.mov
+# are popular with phishing kits.
+FILE_EXTENSIONS = frozenset({
+    "exe", "dll", "sys", "js", "jse", "vbs", "vbe", "ps1", "psm1", "bat", "cmd",
+    "scr", "msi", "lnk", "hta", "jar", "apk", "bin", "elf", "dylib",
+    "doc", "docx", "docm", "xls", "xlsx", "xlsm", "ppt", "pptx", "pdf", "rtf",
+    "txt", "log", "csv", "json", "xml", "yaml", "yml", "ini", "cfg", "conf",
+    "html", "htm", "php", "asp", "aspx", "jsp", "rb",
+    "rar", "7z", "gz", "tgz", "tar", "iso", "img", "vhd",
+    "png", "jpg", "jpeg", "gif", "svg", "mp4", "tmp", "dat", "db",
+})
+
+
+class SuffixList:
+    """Public suffix rules as three sets: plain, wildcard (*.x) and exception (!x)."""
+
+    def __init__(self, path=PSL_FILE, include_private=False):
+        self.rules = set()
+        self.wildcards = set()
+        self.exceptions = set()
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("// ===BEGIN PRIVATE DOMAINS===") and not include_private:
+                    break
+                if not line or line.startswith("//"):
+                    continue
+                if line.startswith("!"):
+                    self.exceptions.add(line[1:])
+                elif line.startswith("*."):
+                    self.wildcards.add(line[2:])
+                else:
+                    self.rules.add(line)
+
+    def suffix_labels(self, labels):
+        """Number of trailing labels forming the public suffix (0 if none)."""
+        n = len(labels)
+        for i in range(n):
+            candidate = ".".join(labels[i:])
+            if candidate in self.exceptions:
+                return n - i - 1
+            if candidate in self.rules:
+                return n - i
+            if i + 1 < n and ".".join(labels[i + 1:]) in self.wildcards:
+                return n - i
+        return 0
+
+
+_suffixes = None
+
+
+def suffix_list():
+    global _suffixes
+    if _suffixes is None:
+        _suffixes = SuffixList()
+    return _suffixes
+
+
+def _decode(label):
+    if label.startswith("xn--"):
+        try:
+            return label.encode("ascii").decode("idna")
+        except UnicodeError:
+            return label
+    return label
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_domain(candidate):
+    """
+    Return candidate if it is a host under a known public suffix, else "".
+    Matches tldextract's `fqdn` (ICANN suffixes, case preserved).
+    """
+    labels = candidate.split(".")
+    if labels[-1].lower() in FILE_EXTENSIONS or "" in labels:
+        return ""
+    suffix = suffix_list().suffix_labels([_decode(label.lower()) for label in labels])
+    if suffix == 0 or suffix >= len(labels):
+        return ""
+    return candidate
@@ -0,0 +1,78 @@
+"""
+Bounded-concurrency fetch engine.
+
+Runs blocking fetch callables on a thread pool with a global concurrency
+cap plus a per-host cap, so many vendors are fetched in parallel without
+hammering any single one of them.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+DEFAULT_WORKERS = 16
+DEFAULT_PER_HOST = 2
+
+
+def host_of(url):
+    try:
+        return urlparse(url or "").netloc.lower()
+    except Exception:
+        return ""
+
+
+class FetchEngine:
+    def __init__(self, max_workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST):
+        self.max_workers = max(1, int(max_workers))
+        self.per_host = max(1, int(per_host))
+        self._lock = threading.Lock()
+        self._host_slots = {}
+
+    def _slot(self, host):
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_host)
+                self._host_slots[host] = slot
+            return slot
+
+    def _run(self, fn, item, url):
+        with self._slot(host_of(url)):
+            try:
+                return fn(item)
+            except Exception as e:
+                print(f"[!] Fetch failed for {url}: {e}")
+                return None
+
+    def map(self, fn, items, url=None):
+        """
+        Call fn(item) for every item concurrently and return the results in
+        input order. `url` maps an item to the URL whose host is rate-capped
+        (defaults to the item itself). Failed calls yield None.
+        """
+        items = list(items)
+        if not items:
+            return []
+        url = url or (lambda item: item)
+
+        # Interleave hosts so workers are not all parked on one busy host
+        by_host = OrderedDict()
+        for i, item in enumerate(items):
+            by_host.setdefault(host_of(url(item)), []).append(i)
+        order = []
+        queues = list(by_host.values())
+        while queues:
+            order.extend(q.pop(0) for q in queues)
+            queues = [q for q in queues if q]
+
+        results = [None] * len(items)
+        workers = min(self.max_workers, len(items))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                i: pool.submit(self._run, fn, items[i], url(items[i]))
+                for i in order
+            }
+            for i, future in futures.items():
+                results[i] = future.result()
+        return results
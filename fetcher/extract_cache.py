@@ -0,0 +1,127 @@
+"""
+Persistent cache of extraction results keyed by article content.
+
+The key is a hash of the whitespace-normalized article text plus a version
+string, so the same body reached through another URL (changed link, UTM
+parameters, a syndicated mirror) costs a hash and a lookup instead of the
+IOC regexes, summary and signature. Versions come from profile_version():
+each profile (the worker, fetch_normalized) shares the file but prune()
+only drops its own rows of other versions, then evicts its least recently
+used rows beyond max_entries.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from fetcher import minhash
+
+CACHE_FILE = "data/extract_cache.db"
+MAX_ENTRIES = 50000
+
+
+def profile_version(profile, revision, scanner):
+    """
+    Cache version of one extraction profile. Bump `revision` whenever
+    extraction changes in a way the scanner fingerprint and the MinHash
+    parameters do not capture.
+    """
+    return f"{profile}-{revision}-{scanner.fingerprint()}-{minhash.VERSION}"
+
+
+def content_key(text):
+    normalized = " ".join(text.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    def __init__(self, version, path=CACHE_FILE, max_entries=MAX_ENTRIES):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.version = str(version)
+        self.profile = self.version.split("-", 1)[0] + "-"
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Parse pool processes open the same file concurrently
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT NOT NULL,"
+            " version TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " used_at REAL NOT NULL,"
+            " PRIMARY KEY (key, version))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_used ON results(used_at)")
+        self._db.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text, compute):
+        """compute(text), or the stored result for the same text and version."""
+        key = content_key(text)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload FROM results WHERE key = ? AND version = ?", (key, self.version)
+            ).fetchone()
+            if row is not None:
+                self.hits += 1
+                self._db.execute(
+                    "UPDATE results SET used_at = ? WHERE key = ? AND version = ?",
+                    (time.time(), key, self.version),
+                )
+                self._db.commit()
+                return json.loads(row[0])
+
+        self.misses += 1
+        result = compute(text)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (key, self.version, json.dumps(result), time.time()),
+            )
+            self._db.commit()
+        return result
+
+    def prune(self):
+        """
+        Drop this profile's rows of other versions, then all but its
+        max_entries most recently used rows. Other profiles are left alone.
+        """
+        own = "substr(version, 1, length(:profile)) = :profile"
+        with self._lock:
+            self._db.execute(
+                f"DELETE FROM results WHERE {own} AND version != :version",
+                {"profile": self.profile, "version": self.version},
+            )
+            self._db.execute(
+                f"DELETE FROM results WHERE {own} AND rowid NOT IN"
+                f" (SELECT rowid FROM results WHERE {own} ORDER BY used_at DESC LIMIT :keep)",
+                {"profile": self.profile, "keep": self.max_entries},
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared(version, path=CACHE_FILE):
+    """
+    One cache per process, version and path. Safe to call from parse pool
+    workers: a process never reuses a connection inherited through fork.
+    """
+    key = (os.getpid(), version, path)
+    with _shared_lock:
+        cache = _shared.get(key)
+        if cache is None:
+            cache = _shared[key] = ExtractionCache(version, path)
+        return cache
@@ -6,10 +6,10 @@ Python 3 compatible, UTF-8 safe, parses RSS + HTML headlines.
 
 import yaml
 import json
-import requests
+import os
+import sys
 import xml.etree.ElementTree as ET
 from datetime import datetime
-import io  # For UTF-8 safe writes
 
 try:
     from bs4 import BeautifulSoup
@@ -17,6 +17,10 @@ try:
 except ImportError:
     HAS_BS4 = False
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fetcher import http_client
+from store import atomic_open
+
 SOURCES_FILE = "sources.yaml"
 OUTPUT_FILE = "data/feed.json"
 
@@ -105,7 +109,7 @@ def fetch_source(src):
     }
 
     try:
-        r = requests.get(src.get("url"), headers=HEADERS, timeout=20)
+        r = http_client.get(src.get("url"), headers=HEADERS, timeout=20)
         entry["status"] = r.status_code
         entry["content_length"] = len(r.text)
 
@@ -129,8 +133,8 @@ def main():
     for src in sources:
         feed.append(fetch_source(src))
 
-    # Python 3 UTF-8 safe write
-    with io.open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+    # UTF-8 safe, atomic write: readers never see a half-written file
+    with atomic_open(OUTPUT_FILE) as f:
         json.dump(feed, f, indent=2, ensure_ascii=False)
 
     print("[+] Wrote {}".format(OUTPUT_FILE))
@@ -1,19 +1,24 @@
-import feedparser
-import json
 import os
+import sys
 from datetime import datetime
 
-DATA_FILE = "../data/feed_normalized.json"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from store import open_store
+from fetcher import http_client
+
+DB_FILE = os.path.join(ROOT, "data", "feed.db")
+DATA_FILE = os.path.join(ROOT, "data", "feed_normalized.json")
 ANYRUN_RSS = "https://any.run/cybersecurity-blog/rss/"
 
 def fetch_anyrun():
-    feed = feedparser.parse(ANYRUN_RSS)
+    feed = http_client.parse_feed(ANYRUN_RSS)
     normalized = []
 
     for entry in feed.entries:
         normalized.append({
             "title": entry.get("title", ""),
-            "link": entry.get("link", ""),
+            "link": (entry.get("feedburner_origlink") or entry.get("link", "")).strip(),
             "published": entry.get("published", ""),
             "source": "ANY.RUN",
             "category": entry.get("tags", [{}])[0].get("term", "Uncategorized") if entry.get("tags") else "Uncategorized",
@@ -22,24 +27,10 @@ def fetch_anyrun():
     return normalized
 
 def update_feed():
-    existing = []
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            existing = json.load(f)
-
-    new_entries = fetch_anyrun()
-    combined = existing + new_entries
-
-    # Optional: remove duplicates by link
-    seen_links = set()
-    deduped = []
-    for e in combined:
-        if e["link"] not in seen_links:
-            deduped.append(e)
-            seen_links.add(e["link"])
+    store = open_store(DB_FILE, DATA_FILE)
 
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(deduped, f, indent=2)
+    # Links already stored (compared canonically) are ignored by the store
+    store.add_entries(fetch_anyrun())
 
 if __name__ == "__main__":
     update_feed()
@@ -1,13 +1,24 @@
 import feedparser
 import requests
-import time
-import json
 import os
-import re
+import sys
 import yaml
-from bs4 import BeautifulSoup, Comment
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fetcher.engine import FetchEngine
+from fetcher import http_client
+from fetcher.http_cache import ValidatorCache
+from fetcher.iocs import extract_iocs, EXTENDED_SCANNER
+from fetcher.article import html_text, summarize, clean_summary
+from fetcher.ratelimit import HostRateLimiter, backoff_delay, retry_after
+from fetcher.pipeline import ParsePool
+from fetcher.urls import RedirectCache
+from fetcher import minhash, extract_cache
+from store import open_store
+
+DB_FILE = "data/feed.db"
 OUTPUT_FILE = "data/feed_normalized.json"
+EXPORT_JSON = True  # keep writing OUTPUT_FILE for the dashboard/workflow
 
 HEADERS = {
     "User-Agent": (
@@ -18,88 +29,41 @@ HEADERS = {
     "Accept-Language": "en-US,en;q=0.9",
 }
 
-REQUEST_DELAY = 1.5
+REQUEST_DELAY = 1.5  # minimum seconds between requests to the same host
 MAX_RETRIES = 3
-BACKOFF = 3
-
-IOC_PATTERNS = {
-    "ip": re.compile(r"\b(?:\d{1,3}(?:\.|\[\.\]|\(dot\))){3}\d{1,3}\b", re.I),
-    "registry": re.compile(r"(?:HKLM|HKCU|HKCR|HKU|HKCC)\\[^\s]+"),
-    "cve": re.compile(r"\bCVE-\d{4}-\d{4,7}\b"),
-    "file_hash": re.compile(r"\b[a-fA-F0-9]{32,64}\b"),
-    "sha256": re.compile(r"\b[a-f0-9]{64}\b", re.I),
-    "sha1": re.compile(r"\b[a-f0-9]{40}\b", re.I),
-    "md5": re.compile(r"\b[a-f0-9]{32}\b", re.I),
-    "mutex": re.compile(r"Mutex:[^\s]+"),
-    "file_path": re.compile(r"[A-Za-z]:\\[^\s<>\"']+"),
-    "service": re.compile(r"\bservice\s+(?:name|display name)\s*[:\-]\s*([A-Za-z0-9_\-]+)", re.I),
-    "domain": re.compile(r"\b(?:[a-z0-9](?:[a-z0-9\-]{0,61}[a-z0-9])?\.)+[a-z]{2,}\b", re.I),
-    "email": re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b", re.I),
-}
+BACKOFF = 3          # base of the jittered exponential backoff, in seconds
+
+# Sources run concurrently; one in flight per host keeps REQUEST_DELAY polite
+FETCH_WORKERS = 8
+FETCH_PER_HOST = 1
+
+# Parse pool size; 0 parses in the source threads
+PARSE_PROCESSES = os.cpu_count() or 1
 
-URL_PATTERN = re.compile(r"https?://", re.I)
+# Revision 2: domains must end in a public suffix
+EXTRACT_VERSION = extract_cache.profile_version("normalized", 2, EXTENDED_SCANNER)
 
-def normalize_ioc(value):
-    return (
-        value.replace("[.]", ".")
-             .replace("(dot)", ".")
-             .replace("hxxp://", "http://")
-             .replace("hxxps://", "https://")
-    )
+# Validator-cache version of the parsed feed entries (see feed_entries)
+FEED_VERSION = "normalized-feed-1"
 
-def safe_fetch(url):
+# Shared by every source thread, so politeness is per host, not per source
+LIMITER = HostRateLimiter(rate=1 / REQUEST_DELAY)
+
+def safe_get(url, headers=None, timeout=15):
     for attempt in range(1, MAX_RETRIES + 1):
+        LIMITER.acquire(url)
         try:
-            r = requests.get(url, headers=HEADERS, timeout=15)
-            if r.status_code == 429:
-                time.sleep(BACKOFF * attempt)
+            r = http_client.get(url, headers={**HEADERS, **(headers or {})}, timeout=timeout)
+            if r.status_code in (429, 503):
+                # Only this host waits; honour Retry-After when given
+                LIMITER.penalize(url, retry_after(r) or backoff_delay(attempt, BACKOFF))
                 continue
             r.raise_for_status()
-            return r.text
+            return r
         except requests.RequestException:
-            time.sleep(BACKOFF * attempt)
+            LIMITER.penalize(url, backoff_delay(attempt, BACKOFF))
     return None
 
-def extract_iocs(text):
-    found = {}
-    for ioc_type, pattern in IOC_PATTERNS.items():
-        matches = set(pattern.findall(text))
-        clean = []
-        for m in matches:
-            if isinstance(m, tuple):
-                m = m[0]
-            m = normalize_ioc(m)
-            if URL_PATTERN.search(m):
-                continue
-            clean.append(m)
-        if clean:
-            found[ioc_type] = sorted(clean)
-    return found
-
-def clean_summary(html):
-    if not html:
-        return ""
-
-    soup = BeautifulSoup(html, "html.parser")
-
-    # Remove HTML comments
-    for comment in soup.find_all(string=lambda t: isinstance(t, Comment)):
-        comment.extract()
-
-    # Extract plain text
-    text = soup.get_text(separator=" ", strip=True)
-
-    # Remove RSS/Reddit boilerplate
-    text = re.sub(r"submitted by.*", "", text, flags=re.I)
-    text = re.sub(r"\[link\]|\[comments\]", "", text, flags=re.I)
-    text = re.sub(r"r/netsec", "", text, flags=re.I)
-
-    # Collapse whitespace
-    text = re.sub(r"\s+", " ", text).strip()
-
-    # Truncate for dashboard
-    return text[:600] + "…" if len(text) > 600 else text
-
 def is_reddit_discussion_only(entry):
     title = entry.get("title", "").lower()
     link = entry.get("link", "").lower()
@@ -118,35 +82,80 @@ def load_sources():
     with open("sources.yaml", "r") as f:
         return yaml.safe_load(f)
 
-def fetch_feed(source):
+def feed_entries(feed):
+    return [
+        {
+            "title": entry.get("title", ""),
+            "link": entry.get("feedburner_origlink") or entry.get("link"),
+            "summary": entry.get("summary", ""),
+            "published": entry.get("published", ""),
+        }
+        for entry in feed.entries
+    ]
+
+def analyze_text(text):
+    return {
+        "iocs": extract_iocs(text),
+        "summary": summarize(text),
+        "minhash": minhash.signature(text),
+    }
+
+def parse_article(html):
+    # One parse feeds the IOC scan, the summary and the near-duplicate
+    # signature; text seen before is looked up instead of rescanned
+    text = html_text(html)
+    return extract_cache.shared(EXTRACT_VERSION).get(text, analyze_text)
+
+def parse_response(response, pool=None):
+    if pool is None:
+        return parse_article(response.text)
+    return pool.run(parse_article, response.text)
+
+def fetch_feed(source, cache=None, pool=None, redirects=None, is_known=None):
     name = source["name"]
     url = source["url"]
     category = source.get("category", "Unknown")
 
     print(f"[*] Fetching {name}…")
-    feed = feedparser.parse(url)
+    if cache is not None:
+        entries = cache.fetch(
+            url, lambda r: feed_entries(feedparser.parse(r.content)), get=safe_get, version=FEED_VERSION
+        ) or []
+    else:
+        r = safe_get(url)
+        entries = feed_entries(feedparser.parse(r.content)) if r is not None else []
     results = []
 
-    for entry in feed.entries[:5]:
+    for entry in entries[:5]:
 
         if name.lower().startswith("reddit") and is_reddit_discussion_only(entry):
             print(f"[~] Skipping Reddit discussion post: {entry.get('title','')}")
             continue
 
-        link = entry.get("link")
-        html = safe_fetch(link)
+        # Redirector links resolved; stored articles are not refetched
+        link = (entry.get("link") or "").strip()
+        if redirects is not None:
+            link = redirects.resolve(link)
+        if is_known is not None and is_known(link):
+            continue
 
-        # Always clean the feed summary (fix for SecurityWeek and similar)
-        summary = clean_summary(entry.get("summary", ""))
+        # Unchanged pages answer 304 and reuse the stored parse
+        if cache is not None:
+            article = cache.fetch(link, lambda r: parse_response(r, pool), get=safe_get, version=EXTRACT_VERSION)
+        else:
+            r = safe_get(link)
+            article = parse_response(r, pool) if r is not None else None
 
         iocs = {}
-        if html:
-            # Extract IOCs from full page
-            text = BeautifulSoup(html, "html.parser").get_text(separator=" ", strip=True)
-            iocs = extract_iocs(text)
-            # Replace summary with cleaned full page text
-            summary = clean_summary(html)
-            time.sleep(REQUEST_DELAY)
+        signature = None
+        if article:
+            iocs = article["iocs"]
+            signature = article.get("minhash")
+            # Summary from the cleaned full page text
+            summary = article["summary"]
+        else:
+            # Fall back to the cleaned feed summary (fix for SecurityWeek and similar)
+            summary = clean_summary(entry.get("summary", ""))
 
         results.append({
             "title": entry.get("title", ""),
@@ -155,7 +164,8 @@ def fetch_feed(source):
             "published": entry.get("published", ""),
             "source": name,
             "category": category,
-            "iocs": iocs
+            "iocs": iocs,
+            "minhash": signature
         })
 
     return results
@@ -167,16 +177,34 @@ def main():
 
     print("[*] Starting normalized fetch")
 
-    for source in sources:
+    store = open_store(DB_FILE, OUTPUT_FILE)
+    cache = ValidatorCache()
+    redirects = RedirectCache()
+    pool = ParsePool(PARSE_PROCESSES)
+
+    def fetch_one(source):
         try:
-            all_entries.extend(fetch_feed(source))
+            return fetch_feed(source, cache, pool, redirects, store.has_article)
         except Exception as e:
             print(f"[!] Failed source {source['name']}: {e}")
-
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(all_entries, f, indent=2)
-
-    print(f"[+] Wrote {len(all_entries)} entries to {OUTPUT_FILE}")
+            return []
+
+    engine = FetchEngine(FETCH_WORKERS, FETCH_PER_HOST)
+    for entries in engine.map(fetch_one, sources, url=lambda s: s["url"]):
+        all_entries.extend(entries or [])
+    pool.close()
+    cache.prune()
+    extract_cache.shared(EXTRACT_VERSION).prune()
+    cache.close()
+    redirects.prune()
+    redirects.close()
+
+    added = store.add_entries(all_entries)
+    print(f"[+] Stored {added} new of {len(all_entries)} entries in {DB_FILE}")
+
+    if EXPORT_JSON:
+        store.export_json(OUTPUT_FILE)
+        print(f"[+] Wrote {store.count()} entries to {OUTPUT_FILE}")
 
 if __name__ == "__main__":
     main()
@@ -6,10 +6,10 @@ Includes many popular threat intel sources automatically.
 """
 
 import json
-import requests
+import os
+import sys
 import xml.etree.ElementTree as ET
 from datetime import datetime
-import io  # For UTF-8 safe writes
 
 try:
     from bs4 import BeautifulSoup
@@ -17,6 +17,10 @@ try:
 except ImportError:
     HAS_BS4 = False
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fetcher import http_client
+from store import atomic_open
+
 OUTPUT_FILE = "data/feed_normalized.json"
 
 HEADERS = {
@@ -109,7 +113,7 @@ def fetch_source(src):
     }
 
     try:
-        r = requests.get(src.get("url"), headers=HEADERS, timeout=20)
+        r = http_client.get(src.get("url"), headers=HEADERS, timeout=20)
         entry["status"] = r.status_code
         entry["content_length"] = len(r.text)
 
@@ -152,7 +156,7 @@ def main():
     feed = [fetch_source(src) for src in SOURCES]
     normalized_feed = normalize_feed(feed)
 
-    with io.open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+    with atomic_open(OUTPUT_FILE) as f:
         json.dump(normalized_feed, f, indent=2, ensure_ascii=False)
 
     print("[+] Wrote normalized feed: {}".format(OUTPUT_FILE))
@@ -0,0 +1,120 @@
+"""
+Persistent HTTP validator cache.
+
+Stores the ETag / Last-Modified validators of every feed and article URL
+together with the parsed result of the last full download. Later fetches
+send If-None-Match / If-Modified-Since and, on a 304, hand back the stored
+parse instead of downloading and parsing the page again. Rows are keyed by
+URL and version: every parse shape (a fetcher's feed items, its article
+results) passes its own version, so two fetchers of the same URL never
+hand each other their payloads, and changing what a parse returns is a
+version bump rather than a shape check at every caller.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from fetcher import http_client
+
+CACHE_FILE = "data/http_cache.db"
+MAX_AGE_DAYS = 30
+
+
+class ValidatorCache:
+    def __init__(self, path=CACHE_FILE):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        columns = {row[1]: row[5] for row in self._db.execute("PRAGMA table_info(validators)")}
+        if columns and not columns.get("version"):
+            # Keyed by url alone: old payloads have no known shape, start over
+            self._db.execute("DROP TABLE validators")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS validators ("
+            " url TEXT NOT NULL,"
+            " version TEXT NOT NULL,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " payload TEXT NOT NULL,"
+            " used_at REAL NOT NULL,"
+            " PRIMARY KEY (url, version))"
+        )
+        self._db.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, url, version):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, payload FROM validators WHERE url = ? AND version = ?",
+                (url, version),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "payload": json.loads(row[2])}
+
+    def _store(self, url, etag, last_modified, payload, version):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO validators"
+                " (url, etag, last_modified, payload, used_at, version) VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, json.dumps(payload), time.time(), version),
+            )
+            self._db.commit()
+
+    def _touch(self, url, version):
+        with self._lock:
+            self._db.execute(
+                "UPDATE validators SET used_at = ? WHERE url = ? AND version = ?",
+                (time.time(), url, version),
+            )
+            self._db.commit()
+
+    def fetch(self, url, parse, get=None, headers=None, timeout=15, version=""):
+        """
+        Return parse(response) for url. When the server answers 304 the
+        result stored from the last 200 is returned without calling parse.
+        `get` is the requests.get-compatible callable used for the request
+        (the shared pooled client by default);
+        it may return None to signal a failed fetch, which is passed through.
+        `version` names the shape of what parse returns; results stored
+        under another version are neither sent as validators nor returned.
+        """
+        cached = self._lookup(url, version)
+        send = dict(headers or {})
+        if cached:
+            if cached["etag"]:
+                send["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                send["If-Modified-Since"] = cached["last_modified"]
+
+        r = (get or http_client.get)(url, headers=send, timeout=timeout)
+        if r is None:
+            return None
+        if r.status_code == 304 and cached:
+            self.hits += 1
+            self._touch(url, version)
+            return cached["payload"]
+
+        self.misses += 1
+        result = parse(r)
+        etag = r.headers.get("ETag")
+        last_modified = r.headers.get("Last-Modified")
+        if r.status_code == 200 and (etag or last_modified):
+            self._store(url, etag, last_modified, result, version)
+        return result
+
+    def prune(self, max_age_days=MAX_AGE_DAYS):
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock:
+            self._db.execute("DELETE FROM validators WHERE used_at < ?", (cutoff,))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
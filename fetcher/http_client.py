@@ -0,0 +1,86 @@
+"""
+Shared HTTP client for every fetcher.
+
+One requests.Session with keep-alive connection pools (one pool per host,
+sized to the fetch engine's per-host cap), compressed transfer encodings
+and a streamed download with a size cap. Feeds are fetched as bytes here
+and handed to feedparser, so they reuse the same pools as article pages.
+"""
+
+import threading
+
+import feedparser
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING  # gzip/deflate, plus br/zstd when installed
+
+from fetcher.engine import DEFAULT_PER_HOST
+
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/121.0 Safari/537.36"
+)
+
+MAX_HOSTS = 64                  # host pools kept alive at once
+MAX_BYTES = 5 * 1024 * 1024     # decoded bytes read per response
+CHUNK_SIZE = 64 * 1024
+TIMEOUT = 15
+
+
+class HttpClient:
+    def __init__(self, per_host=DEFAULT_PER_HOST, max_hosts=MAX_HOSTS, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_hosts, pool_maxsize=per_host, pool_block=False)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "User-Agent": USER_AGENT,
+            "Accept-Encoding": ACCEPT_ENCODING,
+        })
+
+    def get(self, url, headers=None, timeout=TIMEOUT):
+        """
+        GET url over the pooled session, streaming the body. Bodies longer
+        than max_bytes are truncated and the connection is dropped.
+        """
+        r = self.session.get(url, headers=headers, timeout=timeout, stream=True)
+        chunks = []
+        size = 0
+        try:
+            for chunk in r.iter_content(CHUNK_SIZE):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= self.max_bytes:
+                    break
+        finally:
+            r.close()
+        # Hand back an ordinary, fully-read Response
+        r._content = b"".join(chunks)[:self.max_bytes]
+        r._content_consumed = True
+        return r
+
+    def parse_feed(self, url, headers=None, timeout=TIMEOUT):
+        return feedparser.parse(self.get(url, headers=headers, timeout=timeout).content)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def client():
+    """The process-wide shared client."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def get(url, headers=None, timeout=TIMEOUT):
+    return client().get(url, headers=headers, timeout=timeout)
+
+
+def parse_feed(url, headers=None, timeout=TIMEOUT):
+    return client().parse_feed(url, headers=headers, timeout=timeout)
@@ -0,0 +1,168 @@
+"""
+Shared IOC extraction engine.
+
+Both app.py and fetcher/fetch_normalized.py scan article text through an
+IOCScanner. A scanner splits the text into whitespace-separated tokens once
+and runs each pattern only over the tokens that contain its trigger
+substring (none of the patterns can match across whitespace, so the
+matches and their order are the same as a findall over the whole text).
+All hash types come from a single hex-run scan classified by length.
+"""
+
+import hashlib
+import re
+
+from fetcher.domains import normalize_domain
+
+# One scan for every hash type; the run length decides md5/sha1/sha256
+HASH_RUN = re.compile(r"\b[a-fA-F0-9]{32,64}\b")
+HASH_MIN = 32
+
+URL_PATTERN = re.compile(r"https?://", re.I)
+
+
+def _select(tokens, triggers):
+    """Tokens containing any of the triggers, joined one per line."""
+    if len(triggers) == 1:
+        a = triggers[0]
+        return "\n".join([t for t in tokens if a in t])
+    if len(triggers) == 2:
+        a, b = triggers
+        return "\n".join([t for t in tokens if a in t or b in t])
+    return "\n".join([t for t in tokens if any(trig in t for trig in triggers)])
+
+
+class IOCScanner:
+    def __init__(self, patterns, hashes=None, fulltext=None):
+        """
+        patterns: name -> (compiled regex, trigger substrings). Every match
+            of the regex contains at least one trigger and no whitespace.
+        hashes: name -> exact hex length, or None for any length 32-64.
+        fulltext: name -> (compiled regex, lowercase trigger) for patterns
+            that can span whitespace; scanned over the whole text, and only
+            when the trigger appears in it.
+        """
+        self.patterns = patterns
+        self.hashes = hashes or {}
+        self.fulltext = fulltext or {}
+
+    def fingerprint(self):
+        """Short hash of every pattern and setting; changes when any of them does."""
+        spec = repr((
+            sorted((n, p.pattern, p.flags, t) for n, (p, t) in self.patterns.items()),
+            sorted(self.hashes.items()),
+            sorted((n, p.pattern, p.flags, t) for n, (p, t) in self.fulltext.items()),
+        ))
+        return hashlib.sha1(spec.encode("utf-8")).hexdigest()[:12]
+
+    def scan(self, text):
+        """Return name -> list of raw findall() matches, in text order."""
+        tokens = text.split()
+        subsets = {}
+        found = {}
+
+        for name, (pattern, triggers) in self.patterns.items():
+            if triggers not in subsets:
+                present = tuple(trig for trig in triggers if trig in text)
+                subsets[triggers] = _select(tokens, present) if present else ""
+            subset = subsets[triggers]
+            found[name] = pattern.findall(subset) if subset else []
+
+        if self.hashes:
+            runs = HASH_RUN.findall("\n".join([t for t in tokens if len(t) >= HASH_MIN]))
+            for name, length in self.hashes.items():
+                found[name] = runs if length is None else [r for r in runs if len(r) == length]
+
+        lower = text.lower() if self.fulltext else ""
+        for name, (pattern, trigger) in self.fulltext.items():
+            found[name] = pattern.findall(text) if trigger in lower else []
+
+        return found
+
+
+# -------------------------
+# Dashboard profile (app.py)
+# -------------------------
+IP_REGEX = r"\b(?:\d{1,3}\.){3}\d{1,3}\b"
+EMAIL_REGEX = r"\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-z]{2,}\b"
+CVE_REGEX = r"\bCVE-\d{4}-\d{4,7}\b"
+DOMAIN_REGEX = r"\b(?:[a-zA-Z0-9-]+\.)+[a-zA-Z]{2,}\b"
+
+BASIC_SCANNER = IOCScanner(
+    patterns={
+        "ip": (re.compile(IP_REGEX), (".",)),
+        "domain": (re.compile(DOMAIN_REGEX), (".",)),
+        "email": (re.compile(EMAIL_REGEX), ("@",)),
+        "cve": (re.compile(CVE_REGEX), ("CVE-",)),
+    },
+    hashes={"md5": 32, "sha1": 40, "sha256": 64},
+)
+
+
+# -------------------------
+# Normalized fetcher profile (fetch_normalized.py)
+# -------------------------
+IOC_PATTERNS = {
+    "ip": re.compile(r"\b(?:\d{1,3}(?:\.|\[\.\]|\(dot\))){3}\d{1,3}\b", re.I),
+    "registry": re.compile(r"(?:HKLM|HKCU|HKCR|HKU|HKCC)\\[^\s]+"),
+    "cve": re.compile(r"\bCVE-\d{4}-\d{4,7}\b"),
+    "file_hash": re.compile(r"\b[a-fA-F0-9]{32,64}\b"),
+    "sha256": re.compile(r"\b[a-f0-9]{64}\b", re.I),
+    "sha1": re.compile(r"\b[a-f0-9]{40}\b", re.I),
+    "md5": re.compile(r"\b[a-f0-9]{32}\b", re.I),
+    "mutex": re.compile(r"Mutex:[^\s]+"),
+    "file_path": re.compile(r"[A-Za-z]:\\[^\s<>\"']+"),
+    "service": re.compile(r"\bservice\s+(?:name|display name)\s*[:\-]\s*([A-Za-z0-9_\-]+)", re.I),
+    "domain": re.compile(r"\b(?:[a-z0-9](?:[a-z0-9\-]{0,61}[a-z0-9])?\.)+[a-z]{2,}\b", re.I),
+    "email": re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b", re.I),
+}
+
+EXTENDED_SCANNER = IOCScanner(
+    patterns={
+        "ip": (IOC_PATTERNS["ip"], (".", "(")),
+        "registry": (IOC_PATTERNS["registry"], ("\\",)),
+        "cve": (IOC_PATTERNS["cve"], ("CVE-",)),
+        "mutex": (IOC_PATTERNS["mutex"], ("Mutex:",)),
+        "file_path": (IOC_PATTERNS["file_path"], (":\\",)),
+        "domain": (IOC_PATTERNS["domain"], (".",)),
+        "email": (IOC_PATTERNS["email"], ("@",)),
+    },
+    hashes={"file_hash": None, "sha256": 64, "sha1": 40, "md5": 32},
+    # "erv", not "service": under re.I the pattern also matches ſ for s and İ for i
+    fulltext={"service": (IOC_PATTERNS["service"], "erv")},
+)
+
+
+def normalize_ioc(value):
+    return (
+        value.replace("[.]", ".")
+             .replace("(dot)", ".")
+             .replace("hxxp://", "http://")
+             .replace("hxxps://", "https://")
+    )
+
+
+def extract_iocs(text):
+    """
+    IOCs by type (sorted, refanged, URLs dropped); empty types omitted.
+    Domains must end in a public suffix, as in the dashboard profile, so
+    cmd.exe or System.Net.WebClient are not reported as hosts.
+    """
+    raw = EXTENDED_SCANNER.scan(text)
+    found = {}
+    for ioc_type in IOC_PATTERNS:
+        clean = []
+        for m in set(raw[ioc_type]):
+            if isinstance(m, tuple):
+                m = m[0]
+            m = normalize_ioc(m)
+            if URL_PATTERN.search(m):
+                continue
+            if ioc_type == "domain":
+                m = normalize_domain(m)
+                if not m:
+                    continue
+            clean.append(m)
+        if clean:
+            found[ioc_type] = sorted(clean)
+    return found
@@ -0,0 +1,91 @@
+"""
+MinHash signatures for near-duplicate article detection.
+
+An article's cleaned text is cut into overlapping word shingles. Each
+shingle is hashed once (one-permutation MinHash): the hash picks one of
+NUM_PERM bins and the bin keeps its smallest value; empty bins borrow
+from the next filled bin (rotation densification). The share of positions
+where two signatures agree estimates the Jaccard similarity of the two
+texts, at one hash per shingle instead of NUM_PERM. For LSH lookups the
+signature is split into BANDS bands of ROWS values: articles that share a
+band bucket are candidates, and only candidates are compared.
+"""
+
+import hashlib
+import random
+import re
+import struct
+import zlib
+
+SHINGLE_WORDS = 5
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+THRESHOLD = 0.5   # estimated Jaccard at or above which two articles are one story
+
+# Fixed seed: signatures are stored, so the permutation must never change
+MERSENNE = (1 << 61) - 1
+SEED = 20240229
+_rng = random.Random(SEED)
+PERM_A, PERM_B = _rng.randrange(1, MERSENNE), _rng.randrange(0, MERSENNE)
+BIN_RANGE = MERSENNE // NUM_PERM + 1  # values within a bin are below this
+
+# Part of extraction cache versions and LSH bucket keys: signatures change
+# whenever this does, and are never compared across versions
+VERSION = f"oph{SHINGLE_WORDS}w{NUM_PERM}b{SEED}"
+
+_BUCKET_KEY = VERSION.encode("ascii")
+WORD = re.compile(r"\w+")
+PACKED = struct.Struct(f"<{NUM_PERM}Q")
+
+
+def shingles(text):
+    """32-bit hashes of the text's word SHINGLE_WORDS-grams."""
+    words = WORD.findall(text.lower())
+    return {
+        zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8"))
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    }
+
+
+def signature(text):
+    """MinHash signature (list of NUM_PERM ints), or None for very short texts."""
+    hashes = shingles(text or "")
+    if not hashes:
+        return None
+    bins = [None] * NUM_PERM
+    for x in hashes:
+        h = (PERM_A * x + PERM_B) % MERSENNE
+        i, value = h % NUM_PERM, h // NUM_PERM
+        if bins[i] is None or value < bins[i]:
+            bins[i] = value
+    # An empty bin takes the next filled bin's value, offset by the distance
+    # so borrowed values never equal a bin's own
+    sig = []
+    for i in range(NUM_PERM):
+        for step in range(NUM_PERM):
+            value = bins[(i + step) % NUM_PERM]
+            if value is not None:
+                sig.append(value + step * BIN_RANGE)
+                break
+    return sig
+
+
+def similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def bands(sig):
+    """Yield (band number, bucket) pairs; buckets are signed 64-bit ints."""
+    for band in range(BANDS):
+        chunk = struct.pack(f"<{ROWS}Q", *sig[band * ROWS:(band + 1) * ROWS])
+        digest = hashlib.blake2b(chunk, digest_size=8, key=_BUCKET_KEY).digest()
+        yield band, int.from_bytes(digest, "big", signed=True)
+
+
+def pack(sig):
+    return PACKED.pack(*sig)
+
+
+def unpack(blob):
+    return list(PACKED.unpack(blob))
@@ -0,0 +1,54 @@
+"""
+CPU stage of the refresh pipeline.
+
+Fetch threads download documents; parsing them (HTML to text, IOC regexes,
+summaries) is CPU-bound and would serialize on the GIL, so it runs on a
+pool of worker processes instead. Threads hand a document to ParsePool.run()
+and get back the compact parse result. At most max_pending documents are
+queued or being parsed at any time; further callers block until a slot
+frees up, so memory stays bounded however fast the network is.
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_PROCESSES = os.cpu_count() or 1
+
+
+def _ready():
+    return True
+
+
+class ParsePool:
+    def __init__(self, processes=DEFAULT_PROCESSES, max_pending=None):
+        """
+        processes: worker processes; 0 parses inline in the calling thread.
+        max_pending: documents allowed in flight (default 2 per process).
+        """
+        self.processes = max(0, int(processes))
+        self._slots = threading.BoundedSemaphore(max_pending or max(1, 2 * self.processes))
+        self._pool = None
+        if self.processes:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes)
+            # Start the workers now, before any fetch threads exist, so no
+            # child is forked while another thread holds a lock
+            self._pool.submit(_ready).result()
+
+    def run(self, fn, *args):
+        """fn(*args) on a worker process; fn must be a module-level function."""
+        if self._pool is None:
+            return fn(*args)
+        with self._slots:
+            return self._pool.submit(fn, *args).result()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,74 @@
+"""
+Per-host rate limiting and retry backoff.
+
+Each host gets its own token bucket, so throttling one vendor (429 /
+Retry-After) only delays further requests to that vendor while requests
+to every other host carry on.
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from fetcher.engine import host_of
+
+MAX_BACKOFF = 60
+
+
+class HostRateLimiter:
+    def __init__(self, rate=1.0, burst=1):
+        """rate: requests per second per host; burst: bucket size."""
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._lock = threading.Lock()
+        self._buckets = {}  # host -> [tokens, last refill, blocked until]
+
+    def _bucket(self, host, now):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = [float(self.burst), now, 0.0]
+        return bucket
+
+    def acquire(self, url):
+        """Block until a request to url's host is allowed."""
+        host = host_of(url)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                bucket = self._bucket(host, now)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+                if now >= bucket[2] and bucket[0] >= 1:
+                    bucket[0] -= 1
+                    return
+                wait = max(bucket[2] - now, (1 - bucket[0]) / self.rate)
+            time.sleep(wait)
+
+    def penalize(self, url, delay):
+        """Hold back every request to url's host for `delay` seconds."""
+        host = host_of(url)
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(host, now)
+            bucket[2] = max(bucket[2], now + delay)
+
+
+def backoff_delay(attempt, base=1.0, cap=MAX_BACKOFF):
+    """Exponential backoff with full jitter for the given 1-based attempt."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+def retry_after(response, cap=MAX_BACKOFF * 5):
+    """Seconds requested by a Retry-After header (delta or HTTP date), or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return min(cap, max(0.0, float(value)))
+    except ValueError:
+        pass
+    try:
+        return min(cap, max(0.0, parsedate_to_datetime(value).timestamp() - time.time()))
+    except (TypeError, ValueError, IndexError):
+        return None
@@ -0,0 +1,103 @@
+"""
+Adaptive per-source refresh schedule.
+
+Tracks, for every feed URL, an exponentially weighted estimate of how many
+new articles it publishes per hour and when it last changed, and derives
+its own polling interval from that: busy feeds are polled often, quiet
+ones back off towards MAX_INTERVAL. State lives in data/schedule.db.
+"""
+
+import os
+import sqlite3
+import time
+
+SCHEDULE_FILE = "data/schedule.db"
+
+MIN_INTERVAL = 15 * 60          # never poll a feed more often than this
+MAX_INTERVAL = 24 * 3600        # nor less often than this
+DEFAULT_INTERVAL = 3600         # until a feed has a rate estimate
+TARGET_NEW_PER_POLL = 1.0       # aim for about one new article per poll
+ALPHA = 0.3                     # weight of the newest rate observation
+STALE_AFTER = 14 * 86400        # unchanged this long: poll at MAX_INTERVAL
+
+
+class AdaptiveSchedule:
+    def __init__(self, path=SCHEDULE_FILE):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sources ("
+            " url TEXT PRIMARY KEY,"
+            " rate REAL,"
+            " interval REAL NOT NULL,"
+            " last_checked REAL,"
+            " last_changed REAL,"
+            " next_due REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def _state(self, url):
+        row = self._db.execute(
+            "SELECT rate, interval, last_checked, last_changed, next_due FROM sources WHERE url = ?",
+            (url,),
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("rate", "interval", "last_checked", "last_changed", "next_due"), row))
+
+    def due(self, sources, now=None):
+        """Sources whose next poll time has passed (new sources are always due)."""
+        now = now or time.time()
+        due = []
+        for source in sources:
+            state = self._state(source["url"])
+            if state is None or state["next_due"] <= now:
+                due.append(source)
+        return due
+
+    def record(self, url, new_items, now=None):
+        """
+        Record a poll of url that found `new_items` new articles (None if
+        the fetch failed) and schedule its next poll.
+        """
+        now = now or time.time()
+        state = self._state(url) or {
+            "rate": None, "interval": DEFAULT_INTERVAL,
+            "last_checked": None, "last_changed": None,
+        }
+
+        if new_items is None:
+            # Failed fetch: keep the estimate, retry after the usual interval
+            interval = state["interval"]
+        else:
+            if state["last_checked"] is not None:
+                hours = max(now - state["last_checked"], 60) / 3600
+                observed = new_items / hours
+                rate = state["rate"]
+                state["rate"] = observed if rate is None else ALPHA * observed + (1 - ALPHA) * rate
+            if new_items:
+                state["last_changed"] = now
+            state["last_checked"] = now
+            interval = self.interval_for(state, now)
+
+        self._db.execute(
+            "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?, ?)",
+            (url, state["rate"], interval, state["last_checked"], state["last_changed"], now + interval),
+        )
+        self._db.commit()
+        return interval
+
+    @staticmethod
+    def interval_for(state, now):
+        if state["last_changed"] is not None and now - state["last_changed"] > STALE_AFTER:
+            return MAX_INTERVAL
+        rate = state["rate"]
+        if rate is None:
+            return DEFAULT_INTERVAL
+        if rate <= 0:
+            return MAX_INTERVAL
+        return min(MAX_INTERVAL, max(MIN_INTERVAL, TARGET_NEW_PER_POLL / rate * 3600))
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,141 @@
+"""
+Canonical article URLs.
+
+Feeds hand out the same article under many spellings: http vs https,
+upper-case hosts, :443, trailing slashes, utm_* and other tracking
+parameters, #fragments, and feed-redirector links such as feedburner's.
+Links are stored and fetched as the feed gave them (a server may well
+tell /post from /post/); canonical_url() only feeds url_key(), the identity
+the store dedupes on (it also ignores the scheme and "www."). Redirector
+links are resolved once and remembered in data/redirects.db.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+REDIRECT_FILE = "data/redirects.db"
+MAX_AGE_DAYS = 90
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "_hsenc", "_hsmi", "mkt_tok", "ncid", "cmpid", "sr_share", "spm",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "oly_")
+
+# Hosts whose links only redirect to the real article
+REDIRECTORS = {
+    "feeds.feedburner.com", "feedproxy.google.com", "feedlinks.feedburner.com",
+    "t.co", "lnkd.in", "bit.ly", "ow.ly", "buff.ly", "dlvr.it", "tinyurl.com",
+}
+
+
+def _is_tracking(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonical_url(url):
+    """
+    Lower-case scheme and host, no default port, fragment or tracking
+    parameters, remaining parameters sorted, no trailing slash (except for
+    the root path). Anything that is not an http(s) URL is returned as is.
+    """
+    url = (url or "").strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return url
+
+    host = parts.hostname.lower().rstrip(".")
+    if ":" in host:
+        host = f"[{host}]"  # IPv6 literal
+    if port and port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+    path = parts.path or "/"
+    while "//" in path:
+        path = path.replace("//", "/")
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(k)
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def url_key(url):
+    """Store identity of a URL: canonical, without scheme and leading www."""
+    canonical = canonical_url(url)
+    scheme, sep, rest = canonical.partition("://")
+    if not sep or scheme not in DEFAULT_PORTS:
+        return canonical
+    return rest[4:] if rest.startswith("www.") else rest
+
+
+def is_redirector(url):
+    try:
+        return (urlsplit(url).hostname or "").lower() in REDIRECTORS
+    except ValueError:
+        return False
+
+
+class RedirectCache:
+    """Final destination of redirector links, resolved once per link."""
+
+    def __init__(self, path=REDIRECT_FILE):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS redirects ("
+            " url TEXT PRIMARY KEY,"
+            " target TEXT NOT NULL,"
+            " resolved_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def resolve(self, url, timeout=10):
+        """Final destination of url; non-redirector links need no request."""
+        url = (url or "").strip()
+        if not is_redirector(url):
+            return url
+        with self._lock:
+            row = self._db.execute("SELECT target FROM redirects WHERE url = ?", (url,)).fetchone()
+        if row is not None:
+            return row[0]
+
+        from fetcher import http_client
+        try:
+            r = http_client.client().session.head(url, allow_redirects=True, timeout=timeout)
+            if r.status_code >= 400:
+                # Some hosts refuse HEAD; a streamed GET we never read is as cheap
+                r = http_client.client().session.get(url, allow_redirects=True, timeout=timeout, stream=True)
+                r.close()
+            target = r.url
+        except Exception:
+            return url  # try again next time
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO redirects VALUES (?, ?, ?)", (url, target, time.time())
+            )
+            self._db.commit()
+        return target
+
+    def prune(self, max_age_days=MAX_AGE_DAYS):
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock:
+            self._db.execute("DELETE FROM redirects WHERE resolved_at < ?", (cutoff,))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Match your own telemetry against every indicator the feed exports.
+
+Reads observables or raw log lines (a file, or - for stdin) and writes one
+CSV row per hit: line number, the observable as seen, the feed IOC it
+matched, the IOC type(s), the match kind and how many articles mention it.
+
+    python match_iocs.py telemetry.txt
+    python match_iocs.py proxy.log -o hits.csv --jobs 4
+
+Exact observables (IPs, hashes, emails, CVEs, domains) are hash-set
+lookups per token; subdomains of a feed domain match by walking the
+token's label suffixes, so cdn.evil.example hits evil.example.
+"""
+
+import argparse
+import csv
+import os
+import re
+import sys
+from itertools import islice
+from multiprocessing import Pool
+
+from store import open_store, ioc_key
+
+DB_FILE = "data/feed.db"
+DATA_FILE = "data/feed_normalized.json"
+
+CHUNK_LINES = 20000
+TOKEN = re.compile(r"[a-z0-9][a-z0-9._@-]*")
+
+
+class IOCMatcher:
+    def __init__(self, iocs):
+        """iocs: iterable of (value, type, article count) rows."""
+        exact = {}
+        for value, ioc_type, count in iocs:
+            key = ioc_key(value).rstrip(".")
+            types, total = exact.get(key, ((), 0))
+            if ioc_type not in types:
+                types += (ioc_type,)
+            exact[key] = (types, total + count)
+        self.exact = {key: (",".join(sorted(types)), count) for key, (types, count) in exact.items()}
+        self.domains = frozenset(key for key, (types, _) in exact.items() if "domain" in types)
+        # Prefilter for the suffix walk: a token can only be a subdomain of
+        # a feed domain if it ends in one of their top-level labels
+        self.tlds = frozenset(d.rpartition(".")[2] for d in self.domains)
+
+    def __len__(self):
+        return len(self.exact)
+
+    def match_line(self, line):
+        """Yield (observable, ioc, types, kind, articles) for each hit in line."""
+        line = line.lower()
+        if "[" in line or "(dot)" in line:
+            line = line.replace("[.]", ".").replace("(dot)", ".")
+        exact = self.exact
+        domains = self.domains
+        tlds = self.tlds
+        for token in TOKEN.findall(line):
+            token = token.rstrip(".")
+            hit = exact.get(token)
+            if hit is not None:
+                yield token, token, hit[0], "exact", hit[1]
+                continue
+            if token.rpartition(".")[2] not in tlds:
+                continue
+            # cdn.evil.example -> evil.example -> example
+            suffix = token.partition("@")[2] or token
+            while True:
+                if suffix in domains and suffix != token:
+                    types, count = exact[suffix]
+                    yield token, suffix, types, "suffix", count
+                    break
+                _, dot, suffix = suffix.partition(".")
+                if not dot or "." not in suffix:
+                    break
+
+
+# -------------------------
+# Parallel matching
+# -------------------------
+MATCHER = None
+
+
+def _init_worker(matcher):
+    global MATCHER
+    MATCHER = matcher
+
+
+def match_chunk(chunk):
+    start, lines = chunk
+    hits = []
+    for n, line in enumerate(lines, start):
+        for hit in MATCHER.match_line(line):
+            hits.append((n,) + hit)
+    return len(lines), hits
+
+
+def read_chunks(f):
+    start = 1
+    while True:
+        lines = list(islice(f, CHUNK_LINES))
+        if not lines:
+            return
+        yield start, lines
+        start += len(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Match observables against the feed's IOCs.")
+    parser.add_argument("input", help="file with one observable or log line per line, - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="CSV of hits (default: stdout)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    store = open_store(DB_FILE, DATA_FILE)
+    matcher = IOCMatcher(store.ioc_counts())
+    print(f"[*] Loaded {len(matcher)} IOCs ({len(matcher.domains)} domains)", file=sys.stderr)
+
+    src = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8", errors="replace")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    writer = csv.writer(dst)
+    writer.writerow(["line", "observable", "ioc", "type", "match", "articles"])
+
+    lines = hits = 0
+    chunks = read_chunks(src)
+    try:
+        if args.jobs > 1:
+            pool = Pool(args.jobs, initializer=_init_worker, initargs=(matcher,))
+            results = pool.imap(match_chunk, chunks)
+        else:
+            pool = None
+            _init_worker(matcher)
+            results = map(match_chunk, chunks)
+        for count, chunk_hits in results:
+            lines += count
+            hits += len(chunk_hits)
+            writer.writerows(chunk_hits)
+        if pool:
+            pool.close()
+            pool.join()
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+    print(f"[+] {hits} hits in {lines} lines", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
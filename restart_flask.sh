@@ -3,6 +3,7 @@
 PORT=5052
 APP_DIR="$(pwd)"
 LOG_FILE="$APP_DIR/flask.log"
+WORKER_LOG_FILE="$APP_DIR/worker.log"
 
 echo "Stopping any Flask processes running on port $PORT..."
 
@@ -21,6 +22,10 @@ while lsof -i:$PORT >/dev/null 2>&1; do
   sleep 0.5
 done
 
+echo "Restarting feed worker..."
+pkill -f "$APP_DIR/worker.py" || true
+nohup python3 "$APP_DIR/worker.py" > "$WORKER_LOG_FILE" 2>&1 &
+
 echo "Starting Flask app..."
 nohup python3 "$APP_DIR/app.py" > "$LOG_FILE" 2>&1 &
 echo "Flask app started on port $PORT. Logs are being written to $LOG_FILE"
@@ -0,0 +1,875 @@
+#!/usr/bin/env python3
+"""
+SQLite feed store.
+
+Articles and their IOCs live in an indexed SQLite database (WAL mode) so
+page loads and exports only read the rows they need. The old
+data/feed_normalized.json file can be imported once and exported on demand.
+
+    python store.py migrate [data/feed_normalized.json]
+    python store.py export  [data/feed_normalized.json]
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from exporters import get_article_domain
+from fetcher import minhash
+from fetcher.iocs import normalize_ioc
+from fetcher.urls import url_key
+
+DB_FILE = "data/feed.db"
+JSON_FILE = "data/feed_normalized.json"
+
+BATCH = 500
+LOOKUP_CHUNK = 500  # values per IN (...) query, well under SQLite's variable limit
+
+SCHEMA = """
+-- AUTOINCREMENT: ids are delta-export cursors, so pruned ids are never reused
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    link TEXT NOT NULL UNIQUE,
+    guid TEXT,
+    title TEXT NOT NULL DEFAULT '',
+    summary TEXT,
+    published TEXT NOT NULL DEFAULT '',
+    published_ts REAL,
+    source TEXT NOT NULL DEFAULT '',
+    category TEXT NOT NULL DEFAULT '',
+    has_iocs INTEGER NOT NULL DEFAULT 0,
+    ingested_at REAL NOT NULL,
+    story_id INTEGER,  -- id of the first article of its near-duplicate group
+    url_key TEXT       -- fetcher.urls.url_key(link): scheme/tracking-insensitive identity
+);
+DROP INDEX IF EXISTS articles_guid;
+CREATE INDEX IF NOT EXISTS articles_source_guid ON articles(source, guid);
+CREATE INDEX IF NOT EXISTS articles_source ON articles(source);
+CREATE INDEX IF NOT EXISTS articles_category ON articles(category);
+CREATE INDEX IF NOT EXISTS articles_published ON articles(published_ts);
+CREATE INDEX IF NOT EXISTS articles_has_iocs ON articles(has_iocs);
+CREATE INDEX IF NOT EXISTS articles_ingested ON articles(ingested_at);
+
+CREATE TABLE IF NOT EXISTS iocs (
+    article_id INTEGER NOT NULL REFERENCES articles(id) ON DELETE CASCADE,
+    type TEXT NOT NULL,
+    value TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS iocs_article ON iocs(article_id);
+DROP INDEX IF EXISTS iocs_value;
+CREATE INDEX IF NOT EXISTS iocs_key ON iocs(lower(value));
+
+-- One row per distinct IOC, merged across every article that mentions it
+CREATE TABLE IF NOT EXISTS indicators (
+    id INTEGER PRIMARY KEY,
+    type TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    sightings INTEGER NOT NULL,
+    -- Bumped on every insert/update: seq is the delta-export cursor
+    -- (one value per write transaction), updated_at its wall-clock time
+    seq INTEGER NOT NULL DEFAULT 1,
+    updated_at REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL DEFAULT 0,  -- set once: the STIX `created` of the indicator
+    UNIQUE (type, key)
+);
+-- MinHash signatures and LSH band buckets for near-duplicate detection
+CREATE TABLE IF NOT EXISTS signatures (
+    article_id INTEGER PRIMARY KEY REFERENCES articles(id) ON DELETE CASCADE,
+    minhash BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    article_id INTEGER NOT NULL REFERENCES articles(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS lsh_lookup ON lsh_buckets(band, bucket);
+CREATE INDEX IF NOT EXISTS lsh_article ON lsh_buckets(article_id);
+
+CREATE TABLE IF NOT EXISTS indicator_sources (
+    type TEXT NOT NULL,
+    key TEXT NOT NULL,
+    source TEXT NOT NULL,
+    PRIMARY KEY (type, key, source)
+) WITHOUT ROWID;
+
+-- Monotonic counters that must survive pruning (name 'seq': indicator writes)
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Full-text index over title, summary and IOC values, rowid = articles.id.
+# Optional: SQLite builds without FTS5 simply have no search.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(title, summary, iocs);
+CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+    DELETE FROM articles_fts WHERE rowid = old.id;
+END;
+"""
+FTS_WEIGHTS = (10.0, 1.0, 5.0)  # bm25 weight of a hit in title, summary, iocs
+QUERY_TERM = re.compile(r'"([^"]*)"?|(\S+)')
+
+# Indexes on columns that _migrate() may have just added
+INDEXES = """
+CREATE INDEX IF NOT EXISTS indicators_seq ON indicators(seq);
+CREATE INDEX IF NOT EXISTS indicators_updated ON indicators(updated_at);
+CREATE INDEX IF NOT EXISTS articles_story ON articles(story_id);
+CREATE UNIQUE INDEX IF NOT EXISTS articles_url_key ON articles(url_key);
+"""
+
+
+@contextmanager
+def atomic_open(path, encoding="utf-8"):
+    """
+    Open path for writing via a temp file in the same directory that is
+    renamed over it on success, so readers see the old file or the new
+    one, never a partial write. On error the temp file is discarded.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def fts_query(text):
+    """
+    Turn a search box query into a safe FTS5 query: "quoted phrases" stay
+    phrases, a trailing * makes a prefix search, and all terms must match.
+    """
+    terms = []
+    for phrase, word in QUERY_TERM.findall(text):
+        prefix = False
+        if word:
+            prefix = word.endswith("*")
+            phrase = word.rstrip("*")
+        phrase = phrase.strip()
+        if phrase:
+            terms.append('"%s"%s' % (phrase.replace('"', '""'), "*" if prefix else ""))
+    if not terms:
+        raise ValueError("empty search query")
+    return " ".join(terms)
+
+
+def ioc_key(value):
+    """Lookup form of an IOC value: trimmed, refanged, lowercase."""
+    return normalize_ioc(value.strip()).lower()
+
+
+def parse_published(value):
+    """Best-effort epoch seconds for an RSS/Atom date string, or None."""
+    if not value:
+        return None
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        try:
+            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class FeedStore:
+    def __init__(self, path=DB_FILE):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        db = self._db()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript(SCHEMA)
+        self._migrate(db)
+        db.executescript(INDEXES)
+        try:
+            db.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+        db.commit()
+        self._backfill_indicators()
+        self._backfill_fts()
+
+    def _migrate(self, db):
+        # Columns added after the first release of a table
+        columns = {r[1] for r in db.execute("PRAGMA table_info(indicators)")}
+        if "seq" not in columns:
+            db.execute("ALTER TABLE indicators ADD COLUMN seq INTEGER NOT NULL DEFAULT 1")
+            db.execute("ALTER TABLE indicators ADD COLUMN updated_at REAL NOT NULL DEFAULT 0")
+            db.execute("UPDATE indicators SET updated_at = last_seen")
+        if "created_at" not in columns:
+            # first_seen is what earlier exports sent as `created`
+            db.execute("ALTER TABLE indicators ADD COLUMN created_at REAL NOT NULL DEFAULT 0")
+            db.execute("UPDATE indicators SET created_at = first_seen")
+        columns = {r[1] for r in db.execute("PRAGMA table_info(articles)")}
+        if "story_id" not in columns:
+            # Articles stored before clustering each start their own story
+            db.execute("ALTER TABLE articles ADD COLUMN story_id INTEGER")
+            db.execute("UPDATE articles SET story_id = id")
+        if "url_key" not in columns:
+            # Key existing articles; later copies of an already-keyed URL stay
+            # unkeyed (NULL) rather than being deleted
+            db.execute("ALTER TABLE articles ADD COLUMN url_key TEXT")
+            seen = set()
+            updates = []
+            for article_id, link in db.execute("SELECT id, link FROM articles ORDER BY id").fetchall():
+                key = url_key(link)
+                if key not in seen:
+                    seen.add(key)
+                    updates.append((key, article_id))
+            db.executemany("UPDATE articles SET url_key = ? WHERE id = ?", updates)
+        db.execute(
+            "INSERT OR IGNORE INTO counters (name, value)"
+            " SELECT 'seq', COALESCE(MAX(seq), 0) FROM indicators"
+        )
+        db.commit()
+        table_sql = db.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'articles'"
+        ).fetchone()[0]
+        if "AUTOINCREMENT" not in table_sql.upper():
+            self._rebuild_articles(db, table_sql)
+
+    def _rebuild_articles(self, db, table_sql):
+        """
+        Recreate a pre-AUTOINCREMENT articles table in place (SQLite's
+        create-copy-drop-rename procedure). Ids are kept; the dropped
+        indexes and the FTS trigger are recreated by the schema scripts.
+        """
+        new_sql = re.sub(
+            r"^CREATE TABLE (?:IF NOT EXISTS )?\"?articles\"?",
+            "CREATE TABLE articles_new",
+            table_sql,
+        )
+        new_sql = re.sub(
+            r"\bid INTEGER PRIMARY KEY\b", "id INTEGER PRIMARY KEY AUTOINCREMENT", new_sql, count=1
+        )
+        db.executescript(
+            "PRAGMA foreign_keys=OFF;"
+            "BEGIN;"
+            f"{new_sql};"
+            "INSERT INTO articles_new SELECT * FROM articles;"
+            "DROP TABLE articles;"
+            "ALTER TABLE articles_new RENAME TO articles;"
+            "COMMIT;"
+            "PRAGMA foreign_keys=ON;"
+        )
+        db.executescript(SCHEMA)
+
+    def _db(self):
+        # One connection per thread; Flask serves requests from a pool
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA foreign_keys=ON")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    # -------------------------
+    # Writes
+    # -------------------------
+    def add_entries(self, entries):
+        """
+        Insert entries whose link is not stored yet; links that differ only
+        in spelling share a url_key (see fetcher/urls.py) and count as one.
+        Returns the number added.
+        """
+        db = self._db()
+        added = 0
+        now = time.time()
+        seq = None
+        with db:
+            for e in entries:
+                link = (e.get("link") or "").strip()
+                if not link:
+                    continue
+                iocs = e.get("iocs") or {}
+                cur = db.execute(
+                    "INSERT OR IGNORE INTO articles"
+                    " (link, url_key, guid, title, summary, published, published_ts,"
+                    "  source, category, has_iocs, ingested_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        link,
+                        url_key(link),
+                        e.get("guid") or None,
+                        e.get("title") or "",
+                        e.get("summary"),
+                        e.get("published") or "",
+                        parse_published(e.get("published")),
+                        e.get("source") or "",
+                        e.get("category") or "",
+                        int(any(iocs.values())),
+                        now,
+                    ),
+                )
+                if not cur.rowcount:
+                    continue
+                article_id = cur.lastrowid
+                db.execute(
+                    "UPDATE articles SET story_id = ? WHERE id = ?",
+                    (self._cluster(db, article_id, e.get("minhash")), article_id),
+                )
+                db.executemany(
+                    "INSERT INTO iocs (article_id, type, value, position) VALUES (?, ?, ?, ?)",
+                    [
+                        (article_id, ioc_type, value, pos)
+                        for ioc_type, values in iocs.items()
+                        for pos, value in enumerate(values or [])
+                    ],
+                )
+                if self.fts:
+                    db.execute(
+                        "INSERT INTO articles_fts (rowid, title, summary, iocs) VALUES (?, ?, ?, ?)",
+                        (
+                            article_id,
+                            e.get("title") or "",
+                            e.get("summary") or "",
+                            " ".join(v for values in iocs.values() for v in values or []),
+                        ),
+                    )
+                if seq is None:
+                    # The article insert holds the write lock, so no other
+                    # writer can take the same seq
+                    seq = self._next_seq(db)
+                seen = parse_published(e.get("published")) or now
+                self._record_sightings(db, link, e.get("source") or "", seen, iocs, seq, now)
+                added += 1
+        if added:
+            self._writes += 1
+        return added
+
+    def _cluster(self, db, article_id, sig):
+        """
+        Story for a new article: that of the most similar stored article
+        among its LSH candidates, if similar enough, else its own id.
+        """
+        if not sig:
+            return article_id
+        buckets = list(minhash.bands(sig))
+        candidates = set()
+        for band, bucket in buckets:
+            candidates.update(
+                r[0] for r in db.execute(
+                    "SELECT article_id FROM lsh_buckets WHERE band = ? AND bucket = ?", (band, bucket)
+                )
+            )
+        story, best = article_id, minhash.THRESHOLD
+        for candidate in candidates:
+            row = db.execute(
+                "SELECT s.minhash, a.story_id FROM signatures s JOIN articles a ON a.id = s.article_id"
+                " WHERE s.article_id = ?",
+                (candidate,),
+            ).fetchone()
+            if row is None:
+                continue
+            score = minhash.similarity(sig, minhash.unpack(row[0]))
+            if score >= best:
+                story, best = row[1] or candidate, score
+        db.execute("INSERT INTO signatures (article_id, minhash) VALUES (?, ?)", (article_id, minhash.pack(sig)))
+        db.executemany(
+            "INSERT INTO lsh_buckets (band, bucket, article_id) VALUES (?, ?, ?)",
+            [(band, bucket, article_id) for band, bucket in buckets],
+        )
+        return story
+
+    def _next_seq(self, db):
+        db.execute("UPDATE counters SET value = value + 1 WHERE name = 'seq'")
+        return db.execute("SELECT value FROM counters WHERE name = 'seq'").fetchone()[0]
+
+    def _record_sightings(self, db, link, source, seen, iocs, seq, now):
+        """Merge one article's IOCs into the indicators table."""
+        article_domain = get_article_domain(link)
+        sightings = set()
+        for ioc_type, values in iocs.items():
+            for value in values or []:
+                # The article's own site is not an indicator
+                if ioc_type == "domain" and article_domain and article_domain in value.lower():
+                    continue
+                key = ioc_key(value)
+                if key and (ioc_type, key) not in sightings:
+                    sightings.add((ioc_type, key))
+                    db.execute(
+                        "INSERT INTO indicators"
+                        " (type, key, value, first_seen, last_seen, sightings, seq, updated_at, created_at)"
+                        " VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?)"
+                        " ON CONFLICT (type, key) DO UPDATE SET"
+                        "  first_seen = MIN(first_seen, excluded.first_seen),"
+                        "  last_seen = MAX(last_seen, excluded.last_seen),"
+                        "  sightings = sightings + 1,"
+                        "  seq = excluded.seq,"
+                        "  updated_at = excluded.updated_at",
+                        (ioc_type, key, value, seen, seen, seq, now, now),
+                    )
+                    db.execute(
+                        "INSERT OR IGNORE INTO indicator_sources (type, key, source) VALUES (?, ?, ?)",
+                        (ioc_type, key, source),
+                    )
+
+    def _backfill_indicators(self):
+        """Build the indicators table once for stores created before it existed."""
+        db = self._db()
+        if db.execute("SELECT 1 FROM indicators LIMIT 1").fetchone():
+            return
+        if not db.execute("SELECT 1 FROM iocs LIMIT 1").fetchone():
+            return
+        now = time.time()
+        with db:
+            seq = self._next_seq(db)
+            rows = db.execute(
+                "SELECT id, link, source, COALESCE(published_ts, ingested_at) FROM articles ORDER BY id"
+            ).fetchall()
+            for i in range(0, len(rows), BATCH):
+                batch = rows[i:i + BATCH]
+                iocs = self._iocs_for([r[0] for r in batch])
+                for article_id, link, source, seen in batch:
+                    self._record_sightings(db, link, source, seen, iocs.get(article_id, {}), seq, now)
+
+    def _backfill_fts(self):
+        """Index every stored article once when the search index is new."""
+        if not self.fts:
+            return
+        db = self._db()
+        if db.execute("SELECT 1 FROM articles_fts LIMIT 1").fetchone():
+            return
+        with db:
+            db.execute(
+                "INSERT INTO articles_fts (rowid, title, summary, iocs)"
+                " SELECT a.id, a.title, COALESCE(a.summary, ''),"
+                "  COALESCE((SELECT group_concat(value, ' ') FROM iocs WHERE article_id = a.id), '')"
+                " FROM articles a"
+            )
+
+    def prune(self, older_than_days):
+        """
+        Drop articles published (or ingested, if undated) before the cutoff.
+        Stories that lose their first article are re-keyed to the oldest
+        one left, so the survivors are still shown. Indicators last seen
+        before the cutoff (seen only in pruned articles) go with them.
+        """
+        cutoff = time.time() - older_than_days * 86400
+        db = self._db()
+        with db:
+            cur = db.execute(
+                "DELETE FROM articles WHERE COALESCE(published_ts, ingested_at) < ?",
+                (cutoff,),
+            )
+            orphaned = db.execute(
+                "SELECT story_id, MIN(id) FROM articles"
+                " WHERE story_id IS NOT NULL AND story_id NOT IN (SELECT id FROM articles)"
+                " GROUP BY story_id"
+            ).fetchall()
+            db.executemany(
+                "UPDATE articles SET story_id = ? WHERE story_id = ?",
+                [(first, old) for old, first in orphaned],
+            )
+            db.execute("DELETE FROM indicators WHERE last_seen < ?", (cutoff,))
+            db.execute(
+                "DELETE FROM indicator_sources WHERE NOT EXISTS ("
+                " SELECT 1 FROM indicators i"
+                " WHERE i.type = indicator_sources.type AND i.key = indicator_sources.key)"
+            )
+        if cur.rowcount:
+            self._writes += 1
+        return cur.rowcount
+
+    def stamp(self):
+        """
+        Cheap change marker: this process's write count plus the size and
+        mtime of the database and its WAL, so commits made by other
+        processes are noticed too. No query, just two stat calls.
+        """
+        parts = [self._writes]
+        for path in (self.path, self.path + "-wal"):
+            try:
+                st = os.stat(path)
+                parts.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                parts.append(None)
+        return tuple(parts)
+
+    # -------------------------
+    # Reads
+    # -------------------------
+    def count(self):
+        return self._db().execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def has_article(self, link, guid=None, source=None):
+        """Stored under this link, or under this guid from the same source."""
+        row = self._db().execute(
+            "SELECT 1 FROM articles WHERE url_key = ?"
+            " OR (? IS NOT NULL AND source = ? AND guid = ?) LIMIT 1",
+            (url_key(link), guid or None, source or "", guid or None),
+        ).fetchone()
+        return row is not None
+
+    def sources(self):
+        rows = self._db().execute("SELECT DISTINCT source FROM articles ORDER BY source")
+        return [r[0] for r in rows]
+
+    def categories(self):
+        rows = self._db().execute("SELECT DISTINCT category FROM articles ORDER BY category")
+        return [r[0] for r in rows]
+
+    def _iocs_for(self, ids):
+        found = {}
+        if not ids:
+            return found
+        marks = ",".join("?" * len(ids))
+        rows = self._db().execute(
+            f"SELECT article_id, type, value FROM iocs WHERE article_id IN ({marks})"
+            " ORDER BY article_id, rowid",
+            ids,
+        )
+        for article_id, ioc_type, value in rows:
+            found.setdefault(article_id, {}).setdefault(ioc_type, []).append(value)
+        return found
+
+    def article_iocs(self, article_id):
+        return self._iocs_for([article_id]).get(article_id, {})
+
+    def _to_entry(self, row, iocs):
+        entry = {
+            "title": row["title"],
+            "link": row["link"],
+            "summary": row["summary"] or "",
+            "published": row["published"],
+            "source": row["source"],
+            "category": row["category"],
+            "iocs": iocs,
+        }
+        if row["guid"]:
+            entry["guid"] = row["guid"]
+        return entry
+
+    def lookup_iocs(self, values):
+        """
+        Inverted IOC lookup through the iocs_key index. Returns
+        {value: [match, ...]} for the requested values that appear in any
+        article; each match names the IOC type and the article.
+        """
+        wanted = {}
+        for value in values:
+            key = ioc_key(value)
+            if key:
+                wanted.setdefault(key, []).append(value)
+
+        found = {}
+        keys = list(wanted)
+        db = self._db()
+        for i in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[i:i + LOOKUP_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            rows = db.execute(
+                "SELECT lower(i.value) AS key, i.type, a.id, a.title, a.link, a.source,"
+                " a.category, a.published FROM iocs i JOIN articles a ON a.id = i.article_id"
+                f" WHERE lower(i.value) IN ({marks}) ORDER BY a.id, i.rowid",
+                chunk,
+            )
+            for row in rows:
+                match = {
+                    "type": row["type"],
+                    "article_id": row["id"],
+                    "title": row["title"],
+                    "link": row["link"],
+                    "source": row["source"],
+                    "category": row["category"],
+                    "published": row["published"],
+                }
+                for value in wanted[row["key"]]:
+                    found.setdefault(value, []).append(match)
+        return found
+
+    def latest_id(self):
+        """Cursor for article deltas: the newest article id ever assigned (0 if none)."""
+        row = self._db().execute("SELECT seq FROM sqlite_sequence WHERE name = 'articles'").fetchone()
+        return row[0] if row else 0
+
+    def latest_seq(self):
+        """Cursor for indicator deltas: the newest write sequence ever used (0 if none)."""
+        return self._db().execute("SELECT value FROM counters WHERE name = 'seq'").fetchone()[0]
+
+    def indicators(self, types=None, after_seq=0, up_to_seq=None, updated_after=None, after=None):
+        """
+        Yield merged IOC entities changed after write sequence after_seq
+        (0: all of them), oldest change first, batch by batch: type, key
+        (lookup form), value, first_seen / last_seen (epoch seconds),
+        sightings (number of articles), sorted sources, created_at (fixed at
+        first insert), and the seq / id / updated_at of the last change.
+        `after` resumes strictly after a (seq, id) position instead.
+        """
+        clauses, params = ["(seq, id) > (?, ?)"], []
+        if types is not None:
+            types = list(types)
+            clauses.append(f"type IN ({','.join('?' * len(types))})")
+            params += types
+        if up_to_seq is not None:
+            clauses.append("seq <= ?")
+            params.append(up_to_seq)
+        if updated_after is not None:
+            clauses.append("updated_at > ?")
+            params.append(updated_after)
+        where = " AND ".join(clauses)
+        pos = tuple(after) if after else (after_seq + 1, 0)
+        while True:
+            rows = self._db().execute(
+                "SELECT id, type, key, value, first_seen, last_seen, sightings, seq, updated_at, created_at,"
+                " (SELECT group_concat(source, char(31)) FROM indicator_sources s"
+                "   WHERE s.type = i.type AND s.key = i.key) AS sources"
+                f" FROM indicators i WHERE {where} ORDER BY seq, id LIMIT ?",
+                list(pos) + params + [BATCH],
+            ).fetchall()
+            if not rows:
+                return
+            for r in rows:
+                yield {
+                    "type": r["type"],
+                    "key": r["key"],
+                    "value": r["value"],
+                    "first_seen": r["first_seen"],
+                    "last_seen": r["last_seen"],
+                    "sightings": r["sightings"],
+                    "sources": sorted(filter(None, (r["sources"] or "").split("\x1f"))),
+                    "seq": r["seq"],
+                    "id": r["id"],
+                    "updated_at": r["updated_at"],
+                    "created_at": r["created_at"],
+                }
+            pos = (rows[-1]["seq"], rows[-1]["id"])
+
+    def ioc_counts(self):
+        """
+        Yield (value, type, article count) for every indicator: the same set
+        the exports publish, so an article's own site is not one.
+        """
+        yield from self._db().execute("SELECT value, type, sightings FROM indicators")
+
+    def search(self, query, limit=50, offset=0, **filters):
+        """
+        Full-text search over titles, summaries and IOC values, best match
+        first (bm25, title hits weigh most). `query` is search box syntax,
+        see fts_query(). Entries come without IOCs but with the page()
+        with_meta fields and a highlighted "snippet" of the summary.
+        """
+        if not self.fts:
+            raise RuntimeError("this SQLite build has no FTS5 support")
+        clauses, params = self._where(**filters)
+        where = " AND ".join(["articles_fts MATCH ?"] + clauses)
+        rows = self._db().execute(
+            "SELECT articles.*, snippet(articles_fts, 1, '[', ']', '…', 16) AS snippet"
+            " FROM articles_fts JOIN articles ON articles.id = articles_fts.rowid"
+            f" WHERE {where} ORDER BY bm25(articles_fts, ?, ?, ?) LIMIT ? OFFSET ?",
+            [fts_query(query)] + params + list(FTS_WEIGHTS) + [limit, offset],
+        ).fetchall()
+        coverage = self._coverage([r["id"] for r in rows if r["story_id"] == r["id"]])
+        entries = []
+        for r in rows:
+            entry = self._to_entry(r, {})
+            del entry["iocs"]
+            entry["id"] = r["id"]
+            entry["has_iocs"] = bool(r["has_iocs"])
+            entry["story_id"] = r["story_id"]
+            entry["coverage"] = coverage.get(r["id"], [])
+            entry["snippet"] = r["snippet"]
+            entries.append(entry)
+        return entries
+
+    def _where(self, source=None, category=None, has_iocs=None, ioc_type=None,
+               published_from=None, published_to=None, ingested_after=None, up_to_id=None,
+               collapse=None):
+        clauses, params = [], []
+        if source is not None:
+            clauses.append("source = ?")
+            params.append(source)
+        if category is not None:
+            clauses.append("category = ?")
+            params.append(category)
+        if has_iocs is not None:
+            clauses.append("has_iocs = ?")
+            params.append(int(bool(has_iocs)))
+        if ioc_type is not None:
+            clauses.append("EXISTS (SELECT 1 FROM iocs WHERE iocs.article_id = articles.id AND iocs.type = ?)")
+            params.append(ioc_type)
+        if published_from is not None:
+            clauses.append("published_ts >= ?")
+            params.append(published_from)
+        if published_to is not None:
+            clauses.append("published_ts < ?")
+            params.append(published_to)
+        if ingested_after is not None:
+            clauses.append("ingested_at > ?")
+            params.append(ingested_after)
+        if up_to_id is not None:
+            clauses.append("id <= ?")
+            params.append(up_to_id)
+        if collapse:
+            # One row per story: its first article
+            clauses.append("(story_id IS NULL OR story_id = id)")
+        return clauses, params
+
+    def _coverage(self, story_ids):
+        """Other articles of each story: story id -> [{title, link, source}]."""
+        found = {}
+        if not story_ids:
+            return found
+        marks = ",".join("?" * len(story_ids))
+        rows = self._db().execute(
+            f"SELECT story_id, title, link, source FROM articles WHERE story_id IN ({marks})"
+            " AND id != story_id ORDER BY id",
+            story_ids,
+        )
+        for story_id, title, link, source in rows:
+            found.setdefault(story_id, []).append({"title": title, "link": link, "source": source})
+        return found
+
+    def page(self, after_id=0, limit=BATCH, with_iocs=True, before_id=None, with_meta=False, **filters):
+        """
+        One page of entries with id > after_id, in insertion order, or,
+        when before_id is given, with id < before_id newest first (0: start
+        from the newest). Returns (entries, last_id); last_id is the cursor
+        passed in when the page is empty. with_meta adds each entry's id,
+        has_iocs flag, story_id and the story's other coverage.
+        """
+        clauses, params = self._where(**filters)
+        if before_id is None:
+            clauses.append("id > ?")
+            params.append(after_id)
+            order, cursor = "id", after_id
+        else:
+            if before_id:
+                clauses.append("id < ?")
+                params.append(before_id)
+            order, cursor = "id DESC", before_id
+        where = " AND ".join(clauses) or "1"
+        rows = self._db().execute(
+            f"SELECT * FROM articles WHERE {where} ORDER BY {order} LIMIT ?",
+            params + [limit],
+        ).fetchall()
+        if not rows:
+            return [], cursor
+        iocs = self._iocs_for([r["id"] for r in rows]) if with_iocs else {}
+        coverage = self._coverage([r["id"] for r in rows if r["story_id"] == r["id"]]) if with_meta else {}
+        entries = []
+        for r in rows:
+            entry = self._to_entry(r, iocs.get(r["id"], {}))
+            if with_meta:
+                entry["id"] = r["id"]
+                entry["has_iocs"] = bool(r["has_iocs"])
+                entry["story_id"] = r["story_id"]
+                entry["coverage"] = coverage.get(r["id"], [])
+            entries.append(entry)
+        return entries, rows[-1]["id"]
+
+    def entries(self, after_id=0, **filters):
+        """Yield entries with id > after_id in insertion order, batch by batch."""
+        last_id = after_id
+        while True:
+            batch, last_id = self.page(last_id, BATCH, **filters)
+            if not batch:
+                return
+            yield from batch
+
+    # -------------------------
+    # JSON import / export
+    # -------------------------
+    def import_json(self, path=JSON_FILE):
+        if not os.path.exists(path):
+            return 0
+        with open(path, "r", encoding="utf-8") as f:
+            return self.add_entries(json.load(f))
+
+    def export_json(self, path=JSON_FILE):
+        """
+        Write the whole feed as a JSON array (same layout as json.dump with
+        indent=2), streamed batch by batch and swapped in atomically.
+        """
+        with atomic_open(path) as f:
+            sep = "[\n  "
+            for entry in self.entries():
+                f.write(sep + json.dumps(entry, indent=2).replace("\n", "\n  "))
+                sep = ",\n  "
+            f.write("[]" if sep.startswith("[") else "\n]")
+
+
+class StoreCache:
+    """
+    In-memory views over a FeedStore (the parsed feed, grouped views,
+    serialized responses, ...). Every view is dropped together as soon as
+    the store's stamp changes; until then get() is a dict lookup.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._views = {}
+
+    def get(self, name, build):
+        # Stamp before building so a write that races the build forces a rebuild
+        stamp = self.store.stamp()
+        with self._lock:
+            if stamp != self._stamp:
+                self._stamp = stamp
+                self._views = {}
+            if name in self._views:
+                return self._views[name]
+        value = build()
+        with self._lock:
+            if stamp == self._stamp:
+                self._views[name] = value
+        return value
+
+
+def open_store(path=DB_FILE, json_path=JSON_FILE):
+    """Open the store, importing the legacy JSON feed the first time."""
+    store = FeedStore(path)
+    if store.count() == 0 and os.path.exists(json_path):
+        store.import_json(json_path)
+    return store
+
+
+def main(argv):
+    if len(argv) < 2 or argv[1] not in ("migrate", "export"):
+        print(__doc__.strip())
+        return 1
+    json_path = argv[2] if len(argv) > 2 else JSON_FILE
+    store = FeedStore()
+    if argv[1] == "migrate":
+        added = store.import_json(json_path)
+        print(f"[+] Imported {added} entries from {json_path} into {DB_FILE}")
+    else:
+        store.export_json(json_path)
+        print(f"[+] Exported {store.count()} entries to {json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Feed refresh worker.
+
+Fetches every source in sources.yaml, extracts IOCs from new articles and
+writes them to the store. Runs as its own process, separate from the web
+tier, and takes an exclusive file lock around each refresh so exactly one
+refresh runs at a time however many workers or web processes are started.
+
+Each source is polled on its own adaptive interval (fetcher/schedule.py):
+every TICK_MINUTES the worker refreshes only the sources that are due.
+
+    python worker.py          # poll due sources now, then every TICK_MINUTES
+    python worker.py --once   # single pass over due sources (cron / CI)
+    python worker.py --all    # single pass over every source
+"""
+
+import fcntl
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+
+import feedparser
+import requests
+import yaml
+from apscheduler.schedulers.blocking import BlockingScheduler
+
+from fetcher.engine import FetchEngine
+from fetcher import http_client
+from fetcher.http_cache import ValidatorCache
+from fetcher.iocs import BASIC_SCANNER
+from fetcher.domains import normalize_domain
+from fetcher.article import html_text
+from fetcher import minhash, extract_cache
+from fetcher.schedule import AdaptiveSchedule
+from fetcher.pipeline import ParsePool
+from fetcher.ratelimit import HostRateLimiter, backoff_delay, retry_after
+from fetcher.urls import RedirectCache, is_redirector, url_key
+from store import open_store
+
+# -------------------------
+# CONFIG
+# -------------------------
+DB_FILE = "data/feed.db"
+DATA_FILE = "data/feed_normalized.json"  # legacy store, now an optional export
+SOURCES_FILE = "sources.yaml"
+LOCK_FILE = "data/refresh.lock"
+
+TICK_MINUTES = 5        # how often to look for sources that are due
+EXPORT_JSON = False     # also rewrite DATA_FILE after each update
+RETENTION_DAYS = None   # drop articles older than this many days (None keeps all)
+
+# Concurrent fetching: global cap and per-vendor cap
+FETCH_WORKERS = 16
+FETCH_PER_HOST = 2
+
+# Per-vendor pacing; a 429/503 holds back only that vendor (Retry-After honoured)
+HOST_RATE = 2.0         # requests per second per host
+MAX_RETRIES = 3
+BACKOFF = 2             # base of the jittered exponential backoff, in seconds
+
+# Article parsing + IOC extraction run on this many processes (0: inline)
+PARSE_PROCESSES = os.cpu_count() or 1
+
+# Revision 2: real TLDs such as .zip are no longer taken for file names
+EXTRACT_VERSION = extract_cache.profile_version("worker", 2, BASIC_SCANNER)
+
+# Validator-cache version of the parsed feed items (see feed_items)
+FEED_VERSION = "worker-feed-1"
+
+LIMITER = HostRateLimiter(rate=HOST_RATE, burst=FETCH_PER_HOST)
+
+# -------------------------
+# HTTP
+# -------------------------
+def get_page(url, headers=None, timeout=10):
+    """
+    GET paced per host, retrying 429/503 and network errors with backoff.
+    Returns the response if it is 2xx (or 304 to a conditional request),
+    else None: error pages are never parsed.
+    """
+    for attempt in range(1, MAX_RETRIES + 1):
+        LIMITER.acquire(url)
+        try:
+            r = http_client.get(url, headers=headers, timeout=timeout)
+        except requests.RequestException:
+            LIMITER.penalize(url, backoff_delay(attempt, BACKOFF))
+            continue
+        if r.status_code in (429, 503):
+            LIMITER.penalize(url, retry_after(r) or backoff_delay(attempt, BACKOFF))
+            continue
+        if 200 <= r.status_code < 300 or r.status_code == 304:
+            return r
+        print(f"[!] {url}: HTTP {r.status_code}")
+        return None
+    print(f"[!] {url}: gave up after {MAX_RETRIES} attempts")
+    return None
+
+# -------------------------
+# IOC EXTRACTION
+# -------------------------
+def extract_iocs_from_text(text):
+    found = BASIC_SCANNER.scan(text)
+    iocs = {
+        "ip": found["ip"],
+        "domain": list(set([normalize_domain(d) for d in set(found["domain"]) if d]) - {""}),
+        "email": found["email"],
+        "md5": found["md5"],
+        "sha1": found["sha1"],
+        "sha256": found["sha256"],
+        "cve": found["cve"],
+        "file_path": [],
+        "service": []
+    }
+    return iocs
+
+def analyze_text(text):
+    return {"iocs": extract_iocs_from_text(text), "minhash": minhash.signature(text)}
+
+def parse_article_html(html):
+    # One text extraction feeds the IOC scan and the near-duplicate signature;
+    # text seen before (mirrors, changed links) is looked up instead
+    text = html_text(html, separator="\n")
+    return extract_cache.shared(EXTRACT_VERSION).get(text, analyze_text)
+
+def parse_article(response, pool=None):
+    if pool is None:
+        return parse_article_html(response.text)
+    return pool.run(parse_article_html, response.text)
+
+def fetch_article(url, cache=None, pool=None):
+    """IOCs and MinHash signature of one article page, or None if it could not be fetched."""
+    try:
+        if cache is not None:
+            return cache.fetch(
+                url, lambda r: parse_article(r, pool), get=get_page, timeout=10, version=EXTRACT_VERSION
+            )
+        r = get_page(url)
+        return parse_article(r, pool) if r is not None else None
+    except Exception as e:
+        print(f"[!] {url}: {e}")
+        return None
+
+# -------------------------
+# SOURCES / RSS FETCHER
+# -------------------------
+def load_sources():
+    if not os.path.exists(SOURCES_FILE):
+        return []
+    with open(SOURCES_FILE, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f)
+        if isinstance(data, dict):
+            return data.get("feeds", [])
+        elif isinstance(data, list):
+            return data
+        else:
+            return []
+
+def feed_items(feed):
+    return [
+        {
+            "title": entry.get("title", ""),
+            # feedburner keeps the real article URL beside its redirect link
+            "link": (entry.get("feedburner_origlink") or entry.get("link", "")).strip(),
+            "published": entry.get("published", ""),
+            "guid": entry.get("id", "")
+        }
+        for entry in feed.entries
+    ]
+
+def response_items(r):
+    """Items of a feed response; None (a failed feed) on an error status."""
+    if not 200 <= r.status_code < 300:
+        print(f"[!] {r.url}: HTTP {r.status_code}")
+        return None
+    return feed_items(feedparser.parse(r.content))
+
+def fetch_feed_items(url, cache=None):
+    if cache is None:
+        r = get_page(url, timeout=15)
+        return response_items(r) if r is not None else None
+    return cache.fetch(url, response_items, get=get_page, version=FEED_VERSION)
+
+def entries_from_items(feed_info, items):
+    normalized = []
+    for item in items:
+        entry = {
+            "title": item["title"],
+            "link": item["link"],
+            "published": item["published"],
+            "source": feed_info.get("name", "Unknown"),
+            "category": feed_info.get("category", "Uncategorized"),
+            "iocs": {}
+        }
+        if item.get("guid"):
+            entry["guid"] = item["guid"]
+        normalized.append(entry)
+    return normalized
+
+def drop_known(entries, is_known):
+    """Keep only entries not already stored and not repeated within `entries`."""
+    new = []
+    seen = set()
+    for e in entries:
+        # guids are only unique within a feed
+        guid = (e["source"], e["guid"]) if e.get("guid") else None
+        keys = [k for k in (url_key(e["link"]), guid) if k]
+        if any(k in seen for k in keys) or is_known(e["link"], e.get("guid"), e["source"]):
+            continue
+        new.append(e)
+        seen.update(keys)
+    return new
+
+def resolve_links(entries, engine, redirects):
+    """Replace redirector links (feedburner, t.co, ...) by the page they redirect to."""
+    pending = [e for e in entries if is_redirector(e["link"])]
+    targets = engine.map(lambda e: redirects.resolve(e["link"]), pending, url=lambda e: e["link"])
+    for entry, target in zip(pending, targets):
+        if target:
+            entry["link"] = target
+
+def attach_iocs(entries, engine, cache=None, pool=None):
+    """
+    Fetch every entry's article and return the entries that were fetched.
+    The rest are left out so the next run retries them instead of storing
+    an error page (or nothing) as the article.
+    """
+    links = [e["link"] for e in entries]
+    results = engine.map(lambda link: fetch_article(link, cache, pool), links)
+    fetched = []
+    for entry, article in zip(entries, results):
+        if article is None:
+            continue
+        entry["iocs"] = article["iocs"]
+        entry["minhash"] = article["minhash"]  # used by the store to group near-duplicates
+        fetched.append(entry)
+    return fetched
+
+def update_feed(incremental=True, store=None, sources=None):
+    """
+    Refresh `sources` (default: all of sources.yaml). Returns a dict of
+    feed URL -> number of new articles, or None where the feed failed.
+    """
+    store = store or open_store(DB_FILE, DATA_FILE)
+    engine = FetchEngine(FETCH_WORKERS, FETCH_PER_HOST)
+    cache = ValidatorCache()
+    sources = load_sources() if sources is None else sources
+
+    # Feeds first, then every article page, each stage fetched concurrently.
+    # Unchanged feeds and pages come back as 304 and reuse the stored parse.
+    feeds = engine.map(lambda s: fetch_feed_items(s["url"], cache), sources, url=lambda s: s["url"])
+    batches = [
+        (feed_info, entries_from_items(feed_info, items))
+        for feed_info, items in zip(sources, feeds)
+        if items is not None
+    ]
+    fresh = [e for _, batch in batches for e in batch]
+
+    # Known-link check on canonical URLs, so http/https, tracking parameters
+    # and redirector links do not cause refetches. Redirects are cached.
+    redirects = RedirectCache()
+    resolve_links(fresh, engine, redirects)
+    redirects.prune()
+    redirects.close()
+
+    # Only fetch and parse articles we have not stored yet. Downloads run on
+    # the engine's threads, parsing on the process pool.
+    if incremental:
+        fresh = drop_known(fresh, store.has_article)
+    if fresh:
+        with ParsePool(PARSE_PROCESSES) as pool:
+            fresh = attach_iocs(fresh, engine, cache, pool)
+    cache.prune()
+    cache.close()
+    extract_cache.shared(EXTRACT_VERSION).prune()
+
+    # Stored links win; the store ignores links it already has
+    store.add_entries(fresh)
+    if RETENTION_DAYS:
+        store.prune(RETENTION_DAYS)
+    if EXPORT_JSON:
+        store.export_json(DATA_FILE)
+
+    # Counted per feed URL: two sources may share a display name
+    kept = {id(e) for e in fresh}
+    counts = {s["url"]: None for s in sources}
+    for feed_info, batch in batches:
+        counts[feed_info["url"]] = sum(id(e) in kept for e in batch)
+    return counts
+
+# -------------------------
+# LOCKED REFRESH
+# -------------------------
+@contextmanager
+def refresh_lock(path=LOCK_FILE):
+    """Yield True if this process holds the refresh lock, False if another does."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        # Released by the OS if this process dies mid-refresh
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def run_refresh(all_sources=False):
+    with refresh_lock() as locked:
+        if not locked:
+            print("[~] Another refresh is already running, skipping")
+            return False
+        schedule = AdaptiveSchedule()
+        try:
+            sources = load_sources()
+            due = sources if all_sources else schedule.due(sources)
+            if not due:
+                return True
+            start = datetime.utcnow()
+            print(f"[*] Refreshing {len(due)}/{len(sources)} sources at {start.isoformat()} UTC")
+            try:
+                counts = update_feed(sources=due)
+            except Exception as e:
+                print(f"[!] Refresh failed: {e}")
+                return False
+            for url, new_items in counts.items():
+                schedule.record(url, new_items)
+            added = sum(n for n in counts.values() if n)
+            print(f"[+] Refresh finished in {(datetime.utcnow() - start).total_seconds():.1f}s, {added} new")
+            return True
+        finally:
+            schedule.close()
+
+# -------------------------
+# MAIN
+# -------------------------
+def main(argv):
+    if "--once" in argv or "--all" in argv:
+        return 0 if run_refresh(all_sources="--all" in argv) else 1
+
+    scheduler = BlockingScheduler()
+    scheduler.add_job(run_refresh, "interval", minutes=TICK_MINUTES,
+                      next_run_time=datetime.now(), max_instances=1, coalesce=True)
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))